@@ -0,0 +1,78 @@
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.logger import SegmentedFileHandler, read_recent_lines, MAX_LOG_LINES
+
+
+class LegacyLimitedFileHandler(logging.FileHandler):
+    # 原来的实现: 每条记录之后读出整个文件, 超过行数时整体重写
+    def __init__(self, filename, mode='a', encoding=None, delay=False, max_lines=MAX_LOG_LINES):
+        super().__init__(filename, mode, encoding, delay)
+        self.max_lines = max_lines
+    
+    def emit(self, record):
+        super().emit(record)
+        self._trim_file()
+    
+    def _trim_file(self):
+        try:
+            with open(self.baseFilename, 'r', encoding=self.encoding) as f:
+                lines = f.readlines()
+            
+            if len(lines) > self.max_lines:
+                with open(self.baseFilename, 'w', encoding=self.encoding) as f:
+                    f.writelines(lines[-self.max_lines:])
+        except Exception:
+            pass
+
+
+def run(handler_class, log_dir: Path, records: int, max_lines: int):
+    log_file = log_dir / f"{handler_class.__name__}.log"
+    handler = handler_class(log_file, encoding='utf-8', max_lines=max_lines)
+    handler.setFormatter(logging.Formatter('%(asctime)s | %(levelname)-8s | %(name)s | %(message)s'))
+    
+    logger = logging.getLogger(f"bench.{handler_class.__name__}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    
+    # 与释放技能时的日志相同的格式和长度
+    start = time.perf_counter()
+    for i in range(records):
+        logger.info(f"释放技能 [S-{i % 9 + 1}] - 按键: alt+{i % 10} #{i}")
+    elapsed = time.perf_counter() - start
+    
+    logger.removeHandler(handler)
+    handler.close()
+    return records / elapsed, log_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比原来的整文件重写与分段轮换日志的每秒写入条数")
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--max-lines', type=int, default=MAX_LOG_LINES)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        legacy_rate, legacy_file = run(LegacyLimitedFileHandler, log_dir, args.records, args.max_lines)
+        segmented_rate, segmented_file = run(SegmentedFileHandler, log_dir, args.records, args.max_lines)
+        
+        # 两种实现保留的最后 max_lines 行应当一致 (时间戳相同精度下只比较消息部分)
+        legacy_lines = legacy_file.read_text(encoding='utf-8').splitlines()
+        recent_lines = read_recent_lines(segmented_file, args.max_lines)
+        same = [line.rsplit(' | ', 1)[-1] for line in legacy_lines] == [line.rsplit(' | ', 1)[-1] for line in recent_lines]
+    
+    print(f"LimitedFileHandler    {legacy_rate:10.0f} 条/秒")
+    print(f"SegmentedFileHandler  {segmented_rate:10.0f} 条/秒  ({segmented_rate / legacy_rate:.1f}x)")
+    print(f"最后 {args.max_lines} 行一致: {same}")
+
+
+if __name__ == "__main__":
+    main()
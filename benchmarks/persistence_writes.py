@@ -0,0 +1,77 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import ConfigManager, SpecConfig, AppSettings, atomic_write, json_bytes
+
+
+def simulate(config_manager: ConfigManager, args, direct: bool) -> float:
+    # 模拟拖动窗口时每个 Configure 都直接提交 (绕过界面的 after 防抖, 即最坏情况) 的同时逐个修改设置字段
+    spec = SpecConfig(spec_name="bench", settings=AppSettings())
+    spec_path = config_manager.config_dir / "bench.json"
+    busy = 0.0
+    
+    def save_history(history):
+        if direct:
+            atomic_write(config_manager.history_file, json_bytes(history))
+        else:
+            config_manager.save_history(history)
+    
+    def save_spec():
+        if direct:
+            atomic_write(spec_path, json_bytes(spec.to_dict()))
+        else:
+            config_manager.save_spec(spec)
+    
+    for step in range(args.events):
+        # 前半段窗口在移动, 后半段停住; 定时保存的内容不变
+        x = min(step, args.events // 2)
+        history = {"last_spec": "bench", "window": {"x": x, "y": 100, "width": 400, "height": 300}}
+        
+        start = time.perf_counter()
+        save_history(history)
+        if step % args.settings_every == 0:
+            spec.settings.threshold = 0.80 + (step // args.settings_every % 5) * 0.01
+            save_spec()
+        busy += time.perf_counter() - start
+        
+        time.sleep(args.interval)
+    
+    config_manager.flush()
+    return busy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比同步写文件与合并写入的实际写盘次数和界面线程耗时")
+    parser.add_argument('--events', type=int, default=300, help="状态变化通知次数")
+    parser.add_argument('--interval', type=float, default=1 / 60, help="两次通知的间隔 (秒)")
+    parser.add_argument('--settings-every', type=int, default=10, help="每隔多少次通知修改一次设置")
+    parser.add_argument('--history-delay', type=float, default=2.0)
+    args = parser.parse_args()
+    
+    for direct in (True, False):
+        with tempfile.TemporaryDirectory() as tmp:
+            config_manager = ConfigManager(
+                config_dir=Path(tmp) / "configs",
+                template_dir=Path(tmp) / "templates",
+                history_delay=args.history_delay
+            )
+            requests = args.events + (args.events + args.settings_every - 1) // args.settings_every
+            busy = simulate(config_manager, args, direct)
+            
+            if direct:
+                print(f"同步写入   请求 {requests:5d}  写盘 {requests:5d}  界面线程耗时 {busy * 1000:8.2f} ms")
+            else:
+                stats = config_manager.writer.get_stats()
+                print(
+                    f"合并写入   请求 {stats['requests']:5d}  写盘 {stats['writes']:5d}  "
+                    f"内容未变 {stats['unchanged']:3d}  界面线程耗时 {busy * 1000:8.2f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.capture import ArrayCapture
+from core.config import ConfigManager
+from core.dispatcher import InputDispatcher, KeyChord
+from core.pipeline import SkillPipeline
+from core.processor import SkillProcessor
+
+
+class DelayedCapture(ArrayCapture):
+    # 模拟真实截图的耗时 (系统调用期间释放 GIL)
+    def __init__(self, frames: List[np.ndarray], delay: float):
+        super().__init__(frames)
+        self.delay = delay
+    
+    def _grab(self, region, buffer):
+        time.sleep(self.delay)
+        return super()._grab(region, buffer)
+
+
+class DryRunDispatcher(InputDispatcher):
+    def _send(self, chord: KeyChord, hold: float):
+        time.sleep(hold)
+
+
+def build_frames(processor: SkillProcessor, size: int) -> List[np.ndarray]:
+    frames = []
+    for binding in processor.icon_bindings.values():
+        frame = np.zeros((size, size, 3), dtype=np.uint8)
+        h, w = binding.template.shape[:2]
+        y, x = (size - h) // 2, (size - w) // 2
+        frame[y:y+h, x:x+w] = binding.template
+        frames.append(frame)
+    return frames
+
+
+def make_processor(args) -> SkillProcessor:
+    # 停止时写回的转移表落在临时配置目录, 不影响真实配置
+    processor = SkillProcessor(ConfigManager(config_dir=args.config_dir))
+    if not processor.load_config(args.spec):
+        raise SystemExit(f"无法加载配置: {args.spec}")
+    
+    settings = processor.settings
+    settings.scan_interval = 1.0 / args.rate
+    settings.max_scan_rate = args.rate
+    settings.frame_gating = False
+    
+    processor.dispatcher = DryRunDispatcher()
+    processor.set_capture_backend(DelayedCapture(build_frames(processor, args.size), args.capture_ms / 1000))
+    processor.monitor_region = (0, 0, args.size, args.size)
+    for binding in processor.icon_bindings.values():
+        binding.cooldown = 0.0
+    return processor
+
+
+def run_serial(args) -> dict:
+    processor = make_processor(args)
+    processor.start()
+    scheduler = processor.scheduler
+    scheduler.configure(processor.settings)
+    scheduler.start()
+    
+    latencies = []
+    deadline = time.perf_counter() + args.duration
+    while time.perf_counter() < deadline and scheduler.wait():
+        result = processor.tick()
+        latencies.append(time.perf_counter() - result.timestamp)
+        scheduler.advance(idle=False)
+    
+    processor.shutdown()
+    return summarize(len(latencies) / args.duration, latencies)
+
+
+def run_pipelined(args) -> dict:
+    processor = make_processor(args)
+    processor.start()
+    pipeline = SkillPipeline(processor)
+    pipeline.start()
+    time.sleep(args.duration)
+    pipeline.stop()
+    processor.shutdown()
+    
+    stats = pipeline.get_stats()
+    return {
+        'throughput_hz': stats['acted'] / args.duration,
+        'latency_avg_ms': stats['latency_avg_ms'],
+        'latency_p95_ms': stats['latency_p95_ms'],
+        'dropped': stats['match_dropped'],
+    }
+
+
+def summarize(throughput: float, latencies: List[float]) -> dict:
+    latencies_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        'throughput_hz': throughput,
+        'latency_avg_ms': float(latencies_ms.mean()),
+        'latency_p95_ms': float(np.percentile(latencies_ms, 95)),
+        'dropped': 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="串行监控循环与流水线的吞吐量/延迟对比")
+    parser.add_argument('--spec', required=True, help="配置名称")
+    parser.add_argument('--size', type=int, default=200, help="监控区域边长")
+    parser.add_argument('--rate', type=float, default=200.0, help="目标扫描频率")
+    parser.add_argument('--capture-ms', type=float, default=15.0, help="模拟截图耗时")
+    parser.add_argument('--duration', type=float, default=5.0, help="每种模式运行秒数")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        args.config_dir = Path(tmp)
+        source = ConfigManager()
+        shutil.copy(source.config_dir / f"{args.spec}.json", args.config_dir)
+        
+        for name, runner in (('serial', run_serial), ('pipelined', run_pipelined)):
+            stats = runner(args)
+            print(
+                f"{name:<10} {stats['throughput_hz']:7.1f} Hz  "
+                f"延迟 avg {stats['latency_avg_ms']:6.1f} ms  p95 {stats['latency_p95_ms']:6.1f} ms  "
+                f"丢弃 {stats['dropped']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
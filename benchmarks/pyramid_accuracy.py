@@ -0,0 +1,156 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.matcher import ImageMatcher
+
+
+def load_icons(template_dir: Path) -> List[np.ndarray]:
+    icons = []
+    for path in sorted(template_dir.glob("*.png")):
+        icon = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_COLOR)
+        if icon is not None:
+            icons.append(icon)
+    return icons
+
+
+def busy_background(rng: np.random.Generator, size: int, icons: List[np.ndarray]) -> np.ndarray:
+    # 噪声底色上铺随机色块和其他技能图标, 模拟动作条周围的界面; 不含被查找的图标本身, 否则会出现并列的最优位置
+    frame = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (5, 5), 0)
+    for _ in range(40):
+        x, y = (int(value) for value in rng.integers(0, size, 2))
+        w, h = (int(value) for value in rng.integers(8, 60, 2))
+        color = tuple(int(value) for value in rng.integers(0, 256, 3))
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+    for _ in range(6):
+        paste(frame, icons[int(rng.integers(len(icons)))], rng)
+    return frame
+
+
+def near_duplicate(rng: np.random.Generator, icon: np.ndarray, noise: float) -> np.ndarray:
+    # 高频噪声和轻微亮度变化: 全分辨率下得分略低于原图, 降采样后几乎无法区分
+    jitter = rng.normal(0, noise, icon.shape) + rng.uniform(-8, 8)
+    return np.clip(icon.astype(np.float32) + jitter, 0, 255).astype(np.uint8)
+
+
+def paste(frame: np.ndarray, icon: np.ndarray, rng: np.random.Generator) -> Tuple[int, int]:
+    h, w = icon.shape[:2]
+    x = int(rng.integers(0, frame.shape[1] - w))
+    y = int(rng.integers(0, frame.shape[0] - h))
+    frame[y:y+h, x:x+w] = icon
+    return x, y
+
+
+def load_recorded_frames(frame_dir: Path) -> List[np.ndarray]:
+    frames = []
+    for path in sorted(frame_dir.glob("*.png")):
+        frame = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is not None:
+            frames.append(frame)
+    return frames
+
+
+def synthetic_cases(args, icons: List[np.ndarray]) -> Iterator[Tuple[np.ndarray, np.ndarray, Optional[Tuple[int, int]]]]:
+    rng = np.random.default_rng(args.seed)
+    for case in range(args.cases):
+        icon = icons[case % len(icons)]
+        others = [other for other in icons if not np.array_equal(other, icon)]
+        frame = busy_background(rng, args.size, others)
+        for _ in range(args.duplicates):
+            paste(frame, near_duplicate(rng, icon, args.noise), rng)
+        truth = paste(frame, icon, rng)
+        yield frame, icon, truth
+
+
+def recorded_cases(frames: List[np.ndarray], icons: List[np.ndarray]) -> Iterator[Tuple[np.ndarray, np.ndarray, Optional[Tuple[int, int]]]]:
+    # 录制的画面中没有已知的实际位置, 每一帧都对所有放得下的模板各查找一次
+    for frame in frames:
+        for icon in icons:
+            if icon.shape[0] <= frame.shape[0] and icon.shape[1] <= frame.shape[1]:
+                yield frame, icon, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在有近似重复图标的复杂背景上核对金字塔匹配与全分辨率匹配的结果")
+    parser.add_argument('--template-dir', type=Path, default=Path(__file__).resolve().parent.parent / "templates")
+    parser.add_argument('--frames', type=Path, help="录制的画面目录 (PNG), 指定后在这些画面上查找每个模板, 不再合成画面")
+    parser.add_argument('--cases', type=int, default=180)
+    parser.add_argument('--size', type=int, default=400, help="画面边长")
+    parser.add_argument('--duplicates', type=int, default=6, help="每个画面中近似重复图标的数量")
+    parser.add_argument('--noise', type=float, default=30.0, help="近似重复图标的噪声标准差")
+    parser.add_argument('--tolerance', type=float, default=1e-4, help="两种匹配的置信度允许的差值")
+    parser.add_argument('--check', action='store_true', help="有任何不一致时以非零状态退出")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    icons = load_icons(args.template_dir)
+    if not icons:
+        raise SystemExit(f"没有可用的模板: {args.template_dir}")
+    
+    if args.frames:
+        frames = load_recorded_frames(args.frames)
+        if not frames:
+            raise SystemExit(f"没有可用的画面: {args.frames}")
+        cases = recorded_cases(frames, icons)
+    else:
+        cases = synthetic_cases(args, icons)
+    
+    matcher = ImageMatcher()
+    total = 0
+    mismatches = 0
+    ties = 0
+    full_seconds = 0.0
+    pyramid_seconds = 0.0
+    
+    for case, (frame, icon, truth) in enumerate(cases):
+        total += 1
+        start = time.perf_counter()
+        full = matcher.match_template(frame, icon, 0.0)
+        full_seconds += time.perf_counter() - start
+        
+        start = time.perf_counter()
+        coarse = matcher.match_template_pyramid(frame, icon, 0.0)
+        pyramid_seconds += time.perf_counter() - start
+        
+        if coarse.location != full.location and coarse.location is not None:
+            # 画面中同一图标出现多次时两个位置得分相同, 在全分辨率下复核金字塔给出的位置, 并列不算不一致
+            x, y = coarse.location
+            h, w = icon.shape[:2]
+            score = float(cv2.matchTemplate(frame[y:y+h, x:x+w], icon, cv2.TM_CCOEFF_NORMED)[0, 0])
+            if abs(score - full.confidence) <= args.tolerance:
+                ties += 1
+                continue
+        
+        if coarse.location != full.location or abs(coarse.confidence - full.confidence) > args.tolerance:
+            mismatches += 1
+            print(
+                f"不一致 #{case}: 全分辨率 {full.location} {full.confidence:.4f}  "
+                f"金字塔 {coarse.location} {coarse.confidence:.4f}  实际位置 {truth}"
+            )
+    
+    if not total:
+        raise SystemExit("没有可比较的用例")
+    
+    print(
+        f"用例 {total}  不一致 {mismatches}  并列 {ties}  "
+        f"回退全分辨率 {matcher.pyramid_fallback_count}/{matcher.pyramid_search_count}"
+    )
+    print(
+        f"全分辨率 {full_seconds * 1000 / total:6.2f} ms/次  "
+        f"金字塔 {pyramid_seconds * 1000 / total:6.2f} ms/次"
+    )
+    
+    if args.check and mismatches:
+        raise SystemExit(f"金字塔匹配与全分辨率匹配有 {mismatches} 处不一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.capture import ArrayCapture
+from core.config import ConfigManager
+from core.dispatcher import InputDispatcher, KeyChord
+from core.processor import SkillProcessor
+
+
+class DryRunDispatcher(InputDispatcher):
+    def _send(self, chord: KeyChord, hold: float):
+        pass
+
+
+def load_recorded_frames(frame_dir: Path) -> List[np.ndarray]:
+    frames = []
+    for path in sorted(frame_dir.glob("*.png")):
+        frame = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is not None:
+            frames.append(frame)
+    return frames
+
+
+def synthesize_session(processor: SkillProcessor, args) -> List[np.ndarray]:
+    # 没有录制的会话时, 按固定循环 (以 --deviation 的概率随机跳转) 生成技能序列, 每个图标显示 --hold 帧
+    rng = np.random.default_rng(args.seed)
+    bindings = list(processor.icon_bindings.values())
+    order = rng.permutation(len(bindings))
+    
+    frames = []
+    position = 0
+    for _ in range(args.casts):
+        if rng.random() < args.deviation:
+            position = int(rng.integers(len(order)))
+        else:
+            position = (position + 1) % len(order)
+        
+        template = bindings[order[position]].template
+        h, w = template.shape[:2]
+        size = max(args.size, h, w)
+        frame = np.zeros((size, size, 3), dtype=np.uint8)
+        y, x = (size - h) // 2, (size - w) // 2
+        frame[y:y+h, x:x+w] = template
+        frames.extend([frame] * args.hold)
+    return frames
+
+
+def make_processor(args, config_dir: Path) -> SkillProcessor:
+    # 转移表写入临时配置目录, 不影响真实配置
+    processor = SkillProcessor(ConfigManager(config_dir=config_dir))
+    if not processor.load_config(args.spec):
+        raise SystemExit(f"无法加载配置: {args.spec}")
+    
+    settings = processor.settings
+    settings.frame_gating = False
+    processor.dispatcher = DryRunDispatcher()
+    for binding in processor.icon_bindings.values():
+        binding.cooldown = 0.0
+    return processor
+
+
+def replay(args, frames: List[np.ndarray], prediction: bool, config_dir: Path) -> dict:
+    processor = make_processor(args, config_dir)
+    processor.settings.rotation_prediction = prediction
+    h, w = frames[0].shape[:2]
+    processor.monitor_region = (0, 0, w, h)
+    processor.start()
+    
+    # 第一遍用于学习转移表和预热缓存, 第二遍计时
+    results = []
+    for measured in (False, True):
+        processor.set_capture_backend(ArrayCapture(frames, loop=False))
+        processor.evaluated_tick_count = 0
+        processor.evaluated_binding_count = 0
+        processor.rotation.reset_stats()
+        
+        start = time.perf_counter()
+        names = [processor.tick().binding for _ in frames]
+        elapsed = time.perf_counter() - start
+        if measured:
+            results = [binding.name if binding else None for binding in names]
+    
+    stats = processor.get_stats()['rotation']
+    processor.enabled = False
+    processor.dispatcher.stop()
+    return {
+        'avg_bindings_per_tick': stats['avg_bindings_per_tick'],
+        'prediction_hit_ratio': stats['prediction_hit_ratio'],
+        'tick_ms': elapsed * 1000 / len(frames),
+        'names': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放会话, 对比按技能转移表排序前后每帧匹配的技能数")
+    parser.add_argument('--spec', required=True, help="配置名称")
+    parser.add_argument('--frames', type=Path, help="录制的监控区域截图目录 (按文件名排序的 PNG)")
+    parser.add_argument('--size', type=int, default=0, help="合成会话时的监控区域边长, 默认与模板相同")
+    parser.add_argument('--casts', type=int, default=300, help="合成会话的技能数")
+    parser.add_argument('--hold', type=int, default=3, help="合成会话中每个图标显示的帧数")
+    parser.add_argument('--deviation', type=float, default=0.2, help="合成会话偏离固定循环的概率")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config_dir = Path(tmp)
+        source = ConfigManager()
+        shutil.copy(source.config_dir / f"{args.spec}.json", config_dir)
+        
+        if args.frames:
+            frames = load_recorded_frames(args.frames)
+        else:
+            frames = synthesize_session(make_processor(args, config_dir), args)
+        if not frames:
+            raise SystemExit("没有可回放的帧")
+        
+        before = replay(args, frames, False, config_dir)
+        after = replay(args, frames, True, config_dir)
+    
+    agree = sum(a == b for a, b in zip(before['names'], after['names']))
+    print(f"帧数 {len(frames)}  结果一致 {agree}/{len(frames)}")
+    for name, stats in (('before', before), ('after', after)):
+        print(
+            f"{name:<8} 每帧匹配技能 {stats['avg_bindings_per_tick']:5.2f}  "
+            f"预测命中率 {stats['prediction_hit_ratio']:6.1%}  每帧 {stats['tick_ms']:6.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODULES = (
+    'core.config',
+    'core.processor',
+    'core.headless',
+    'ui.main_window',
+)
+
+# 子进程中先导入被测模块, 再报告哪些重量级依赖已经被加载
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in ('numpy', 'cv2', 'pyautogui', 'keyboard', 'tkinter', 'customtkinter', 'PIL', 'pynput') if name in sys.modules]
+print(elapsed, ','.join(heavy))
+"""
+
+SPEC_PROBE = """
+import time
+start = time.perf_counter()
+from core.config import ConfigManager
+from core.processor import SkillProcessor
+config_manager = ConfigManager()
+if {cold!r}:
+    config_manager.get_template_cache_path({spec!r}).unlink(missing_ok=True)
+processor = SkillProcessor(config_manager)
+imported = time.perf_counter()
+ok = processor.load_config({spec!r})
+print(imported - start, time.perf_counter() - imported, int(ok))
+"""
+
+
+def run_probe(code: str) -> str:
+    # 每次都用新的解释器, 测到的是冷启动 (模块未缓存在 sys.modules 中) 的导入耗时
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        encoding='utf-8'
+    )
+    if result.returncode != 0:
+        return ''
+    return result.stdout.strip().splitlines()[-1]
+
+
+def bench_module(module: str, runs: int):
+    samples = []
+    heavy = ''
+    for _ in range(runs):
+        output = run_probe(PROBE.format(module=module))
+        if not output:
+            print(f"{module:<18} 导入失败 (缺少依赖)")
+            return
+        elapsed, _, heavy = output.partition(' ')
+        samples.append(float(elapsed) * 1000)
+    
+    print(
+        f"{module:<18} 中位数 {statistics.median(samples):7.1f} ms  最小 {min(samples):7.1f} ms  "
+        f"已加载: {heavy or '-'}"
+    )
+
+
+def bench_spec(spec: str, runs: int, cold: bool):
+    imports, loads = [], []
+    for _ in range(runs):
+        output = run_probe(SPEC_PROBE.format(spec=spec, cold=cold))
+        if not output:
+            print(f"加载配置 {spec} 失败")
+            return
+        imported, loaded, ok = output.split()
+        if ok != '1':
+            print(f"加载配置 {spec} 失败")
+            return
+        imports.append(float(imported) * 1000)
+        loads.append(float(loaded) * 1000)
+    
+    print(
+        f"配置 {spec} ({'无缓存' if cold else '有缓存'}): 导入 {statistics.median(imports):7.1f} ms  "
+        f"加载 (含模板解码) {statistics.median(loads):7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在新进程中测量各入口模块的导入耗时和配置加载耗时")
+    parser.add_argument('--runs', type=int, default=5, help="每项测量的次数")
+    parser.add_argument('--spec', help="同时测量加载该配置的耗时")
+    parser.add_argument('--module', action='append', help="只测量指定模块, 可重复")
+    args = parser.parse_args()
+    
+    for module in args.module or MODULES:
+        bench_module(module, args.runs)
+    if args.spec:
+        bench_spec(args.spec, args.runs, cold=True)
+        bench_spec(args.spec, args.runs, cold=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.bank import TemplateBank, CompiledTemplate
+from core.matcher import ImageMatcher
+
+
+def load_icons(template_dir: Path, spec: str) -> List[np.ndarray]:
+    icons = []
+    for path in sorted(template_dir.glob(f"{spec}_*.png")):
+        icon = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_COLOR)
+        if icon is not None:
+            icons.append(icon)
+    return icons
+
+
+def legacy_hash(gray: np.ndarray, hash_size: int = 16) -> np.ndarray:
+    # 原来的 calculate_perceptual_hash: 每个窗口单独缩放, 并拼出 '0'/'1' 字符串
+    resized = cv2.resize(gray, (hash_size + 1, hash_size))
+    diff = resized[:, 1:] > resized[:, :-1]
+    ''.join(['1' if b else '0' for b in diff.flatten()])
+    return diff
+
+
+def legacy_search(region_gray: np.ndarray, template: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+    # 原来的 _find_icon_with_hash: 每个技能逐个 (x, y) 窗口计算哈希和相似度
+    icon_hash = legacy_hash(cv2.cvtColor(template, cv2.COLOR_BGR2GRAY))
+    h, w = region_gray.shape[:2]
+    icon_h, icon_w = template.shape[:2]
+    
+    max_similarity = 0.0
+    best_location = None
+    for y in range(0, h - icon_h + 1):
+        for x in range(0, w - icon_w + 1):
+            window_hash = legacy_hash(region_gray[y:y+icon_h, x:x+icon_w])
+            similarity = 1 - np.sum(icon_hash != window_hash) / icon_hash.size
+            if similarity > max_similarity:
+                max_similarity = similarity
+                best_location = (x, y)
+    return max_similarity, best_location
+
+
+def vectorized_search(
+    matcher: ImageMatcher,
+    bank: TemplateBank,
+    region_gray: np.ndarray,
+    entries: List[CompiledTemplate]
+) -> List[Tuple[float, Tuple[int, int]]]:
+    # 同尺寸技能共用一次窗口哈希, 再对所有技能一次性比较
+    results = []
+    for size, members, hash_matrix in bank.hash_groups(entries):
+        packed_windows = matcher.calculate_packed_window_hashes(region_gray, size, bank.hash_size)
+        similarities = matcher.calculate_batch_similarities(packed_windows, hash_matrix, bank.hash_bits)
+        for values in similarities:
+            y, x = np.unravel_index(np.argmax(values), values.shape)
+            results.append((float(values[y, x]), (int(x), int(y))))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比逐窗口计算哈希与向量化窗口哈希的每帧耗时")
+    parser.add_argument('--spec', default="惩戒骑一号", help="使用该配置的模板")
+    parser.add_argument('--size', type=int, default=200, help="监控区域边长")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    icons = load_icons(Path(__file__).resolve().parent.parent / "templates", args.spec)
+    if not icons:
+        raise SystemExit(f"没有可用的模板: {args.spec}")
+    
+    rng = np.random.default_rng(args.seed)
+    region = cv2.GaussianBlur(rng.integers(0, 256, (args.size, args.size, 3), dtype=np.uint8), (3, 3), 0)
+    icon_h, icon_w = icons[0].shape[:2]
+    y, x = (int(value) for value in rng.integers(0, args.size - max(icon_h, icon_w), 2))
+    region[y:y+icon_h, x:x+icon_w] = icons[0]
+    region_gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+    
+    matcher = ImageMatcher()
+    bank = TemplateBank(matcher)
+    entries = [bank.add(f"S-{i + 1}", icon) for i, icon in enumerate(icons)]
+    
+    start = time.perf_counter()
+    legacy = legacy_search(region_gray, icons[0])
+    legacy_seconds = time.perf_counter() - start
+    
+    for count in sorted({1, len(entries)}):
+        subset = entries[:count]
+        vectorized_search(matcher, bank, region_gray, subset)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            results = vectorized_search(matcher, bank, region_gray, subset)
+        seconds = (time.perf_counter() - start) / args.repeat
+        
+        # 原来的实现每个技能都要完整扫描一遍, 耗时与技能数成正比
+        print(
+            f"{count} 个技能  逐窗口 {legacy_seconds * count * 1000:8.1f} ms  "
+            f"向量化 {seconds * 1000:6.2f} ms  ({legacy_seconds * count / seconds:5.1f}x)"
+        )
+    
+    print(f"第一个技能结果一致: {results[0] == legacy}  {legacy}")
+
+
+if __name__ == "__main__":
+    main()
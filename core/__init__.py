@@ -1,11 +1,30 @@
-from .config import ConfigManager, AppSettings, IconBindingData
-from .processor import SkillProcessor
-from .matcher import ImageMatcher
-
-__all__ = [
-    'ConfigManager',
-    'AppSettings', 
-    'IconBindingData',
-    'SkillProcessor',
-    'ImageMatcher',
-]
+import importlib
+
+# 导出名 -> 子模块; 第一次访问时才导入, import core.config 不会连带加载 cv2 等依赖
+_EXPORTS = {
+    'ConfigManager': 'config',
+    'AppSettings': 'config',
+    'IconBindingData': 'config',
+    'MonitorRegion': 'config',
+    'SkillProcessor': 'processor',
+    'ImageMatcher': 'matcher',
+    'TemplateBank': 'bank',
+    'CaptureBackend': 'capture',
+    'create_capture_backend': 'capture',
+    'ScanScheduler': 'scheduler',
+    'InputDispatcher': 'dispatcher',
+    'KeyChord': 'dispatcher',
+    'SkillPipeline': 'pipeline',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
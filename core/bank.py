@@ -0,0 +1,220 @@
+from dataclasses import dataclass
+from typing import Optional, Dict, Tuple, List, Iterator, FrozenSet
+import numpy as np
+
+from core.matcher import ImageMatcher, PerceptualHash, ColorSignature
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+@dataclass
+class CompiledTemplate:
+    name: str
+    template: np.ndarray
+    gray: np.ndarray
+    phash: PerceptualHash
+    saturation: Optional[float]
+    color: Optional[ColorSignature]
+    
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.gray.shape[:2]
+    
+    @property
+    def hash_bits(self) -> np.ndarray:
+        return self.phash.bits
+    
+    @property
+    def packed_hash(self) -> np.ndarray:
+        return self.phash.words
+
+
+class TemplateBank:
+    GROUP_CACHE_SIZE = 64
+    
+    def __init__(
+        self,
+        matcher: Optional[ImageMatcher] = None,
+        hash_size: int = 16
+    ):
+        self.matcher = matcher or ImageMatcher()
+        self.hash_size = hash_size
+        self._entries: Dict[str, CompiledTemplate] = {}
+        self._groups: Dict[FrozenSet[int], List[Tuple[Tuple[int, int], List[CompiledTemplate], np.ndarray]]] = {}
+        self._shifted: Dict[Tuple[Tuple[int, ...], int], List[Tuple[Tuple[int, int], np.ndarray]]] = {}
+        self._colors: Dict[Tuple[int, ...], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.version = 0
+    
+    @property
+    def hash_bits(self) -> int:
+        return self.hash_size * self.hash_size
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(entry.template.nbytes + entry.gray.nbytes for entry in self._entries.values())
+    
+    def compile(self, name: str, template: np.ndarray) -> CompiledTemplate:
+        # 只计算特征, 不修改共享状态, 可以在线程池中并行调用
+        gray = self.matcher.to_gray(template)
+        
+        return CompiledTemplate(
+            name=name,
+            template=template,
+            gray=gray,
+            phash=self.matcher.calculate_hash(gray, self.hash_size),
+            saturation=self.matcher.calculate_mean_saturation(template),
+            color=self.matcher.calculate_color_signature(template)
+        )
+    
+    def add(self, name: str, template: np.ndarray) -> CompiledTemplate:
+        return self.add_compiled(self.compile(name, template))
+    
+    def add_compiled(self, entry: CompiledTemplate) -> CompiledTemplate:
+        name = entry.name
+        previous = self._entries.get(name)
+        if previous is not None and previous.template is not entry.template:
+            self.matcher.invalidate_template(previous.template)
+        
+        self._entries[name] = entry
+        self._groups.clear()
+        self._shifted.clear()
+        self._colors.clear()
+        self.version += 1
+        logger.debug(f"编译模板: {name}")
+        return entry
+    
+    def remove(self, name: str) -> bool:
+        self._groups.clear()
+        self._shifted.clear()
+        self._colors.clear()
+        self.version += 1
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return False
+        self.matcher.invalidate_template(entry.template)
+        return True
+    
+    def get(self, name: str, template: np.ndarray) -> CompiledTemplate:
+        entry = self._entries.get(name)
+        
+        # 模板被重新截取时只重新编译这一项
+        if entry is None or entry.template is not template:
+            entry = self.add(name, template)
+        
+        return entry
+    
+    def get_scaled(
+        self,
+        entry: CompiledTemplate,
+        scale: float,
+        interpolation: Optional[int] = None
+    ) -> np.ndarray:
+        return self.matcher.get_scaled_template(entry.template, scale, interpolation)
+    
+    def hash_groups(
+        self,
+        entries: List[CompiledTemplate]
+    ) -> List[Tuple[Tuple[int, int], List[CompiledTemplate], np.ndarray]]:
+        # 按模板尺寸分组, 每组的打包哈希堆叠成 (N, words) 矩阵供一次性比较;
+        # 候选顺序每帧都可能变化, 组内成员按名称排列, 同一组候选总是命中同一项缓存
+        key = frozenset(id(entry) for entry in entries)
+        groups = self._groups.get(key)
+        
+        if groups is None:
+            if len(self._groups) >= self.GROUP_CACHE_SIZE:
+                self._groups.clear()
+            
+            by_size: Dict[Tuple[int, int], List[CompiledTemplate]] = {}
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                by_size.setdefault(entry.size, []).append(entry)
+            
+            groups = [
+                (size, members, np.stack([entry.packed_hash for entry in members]))
+                for size, members in by_size.items()
+            ]
+            self._groups[key] = groups
+        
+        return groups
+    
+    def shifted_hashes(
+        self,
+        members: List[CompiledTemplate],
+        jitter: int
+    ) -> List[Tuple[Tuple[int, int], np.ndarray]]:
+        # 固定槽位模式: 帧相对模板平移 (dx, dy) 时, 只取两者重叠部分的哈希, 按偏移从小到大排列
+        key = (tuple(id(entry) for entry in members), jitter)
+        shifted = self._shifted.get(key)
+        
+        if shifted is None:
+            if len(self._shifted) >= self.GROUP_CACHE_SIZE:
+                self._shifted.clear()
+            
+            shifts = sorted(
+                ((dx, dy) for dy in range(-jitter, jitter + 1) for dx in range(-jitter, jitter + 1)),
+                key=lambda shift: (abs(shift[0]) + abs(shift[1]), shift)
+            )
+            
+            shifted = []
+            for dx, dy in shifts:
+                hashes = []
+                for entry in members:
+                    _, template_slice = self.shift_slices(entry.size, dx, dy)
+                    hashes.append(self.matcher.calculate_hash(entry.gray[template_slice], self.hash_size).words)
+                shifted.append(((dx, dy), np.stack(hashes)))
+            
+            self._shifted[key] = shifted
+        
+        return shifted
+    
+    def color_signatures(
+        self,
+        members: List[CompiledTemplate]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # 组内颜色签名堆叠成 (N, 3) 均值与 (N, bins) 直方图, 没有签名的成员由 valid 标记
+        key = tuple(id(entry) for entry in members)
+        colors = self._colors.get(key)
+        
+        if colors is None:
+            if len(self._colors) >= self.GROUP_CACHE_SIZE:
+                self._colors.clear()
+            
+            valid = np.array([entry.color is not None for entry in members])
+            means = np.zeros((len(members), 3))
+            hue_hists = np.zeros((len(members), self.matcher.HUE_BINS))
+            for i, entry in enumerate(members):
+                if entry.color is not None:
+                    means[i] = entry.color.mean
+                    hue_hists[i] = entry.color.hue_hist
+            
+            colors = (valid, means, hue_hists)
+            self._colors[key] = colors
+        
+        return colors
+    
+    @staticmethod
+    def shift_slices(
+        size: Tuple[int, int],
+        dx: int,
+        dy: int
+    ) -> Tuple[Tuple[slice, slice], Tuple[slice, slice]]:
+        h, w = size
+        frame_slice = (slice(max(0, dy), h + min(0, dy)), slice(max(0, dx), w + min(0, dx)))
+        template_slice = (slice(max(0, -dy), h - max(0, dy)), slice(max(0, -dx), w - max(0, dx)))
+        return frame_slice, template_slice
+    
+    def clear(self):
+        self._entries.clear()
+        self._groups.clear()
+        self._shifted.clear()
+        self._colors.clear()
+        self.version += 1
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __iter__(self) -> Iterator[CompiledTemplate]:
+        return iter(list(self._entries.values()))
@@ -0,0 +1,176 @@
+from typing import Optional, Dict, Any, Tuple, List, Union, Iterable
+from pathlib import Path
+import time
+import numpy as np
+
+from utils.lazy import lazy_import
+from utils.logger import get_logger
+
+cv2 = lazy_import('cv2')
+pyautogui = lazy_import('pyautogui')
+
+logger = get_logger()
+
+Region = Tuple[int, int, int, int]
+
+
+def union_region(regions: Iterable[Region]) -> Region:
+    # 多个监控区域的外接矩形, 每帧只截一次图
+    regions = list(regions)
+    x1 = min(x for x, _, _, _ in regions)
+    y1 = min(y for _, y, _, _ in regions)
+    x2 = max(x + w for x, _, w, _ in regions)
+    y2 = max(y + h for _, y, _, h in regions)
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
+def crop_region(frame: np.ndarray, origin: Region, region: Region) -> Optional[np.ndarray]:
+    # 从外接矩形的截图中切出子区域的视图 (不复制), 子区域不在截图范围内时返回 None
+    x, y, w, h = region
+    dx, dy = x - origin[0], y - origin[1]
+    if dx < 0 or dy < 0 or dx + w > frame.shape[1] or dy + h > frame.shape[0]:
+        return None
+    return frame[dy:dy+h, dx:dx+w]
+
+
+class CaptureBackend:
+    name = "base"
+    
+    def __init__(self):
+        self._buffer: Optional[np.ndarray] = None
+        self.grab_count = 0
+        self.last_latency = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+    
+    def grab(self, region: Region) -> np.ndarray:
+        # 返回预分配 BGRA 缓冲区的视图, 下一次 grab 会覆盖其内容, 需要保留时请复制
+        start = time.perf_counter()
+        frame = self._grab(region, self._ensure_buffer(region))
+        
+        latency = time.perf_counter() - start
+        self.grab_count += 1
+        self.last_latency = latency
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        
+        return frame
+    
+    def _grab(self, region: Region, buffer: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+    
+    def _ensure_buffer(self, region: Region) -> np.ndarray:
+        _, _, w, h = region
+        if self._buffer is None or self._buffer.shape[:2] != (h, w):
+            self._buffer = np.empty((h, w, 4), dtype=np.uint8)
+        return self._buffer
+    
+    def get_stats(self) -> Dict[str, Any]:
+        avg_latency = self.total_latency / self.grab_count if self.grab_count else 0.0
+        return {
+            'backend': self.name,
+            'grabs': self.grab_count,
+            'last_ms': self.last_latency * 1000,
+            'avg_ms': avg_latency * 1000,
+            'max_ms': self.max_latency * 1000,
+        }
+    
+    def reset_stats(self):
+        self.grab_count = 0
+        self.last_latency = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+    
+    def close(self):
+        self._buffer = None
+
+
+class PyAutoGuiCapture(CaptureBackend):
+    name = "pyautogui"
+    
+    def _grab(self, region: Region, buffer: np.ndarray) -> np.ndarray:
+        screenshot = pyautogui.screenshot(region=region)
+        cv2.cvtColor(np.asarray(screenshot), cv2.COLOR_RGB2BGRA, dst=buffer)
+        return buffer
+
+
+class MssCapture(CaptureBackend):
+    name = "mss"
+    
+    def __init__(self):
+        super().__init__()
+        import mss
+        self._sct = mss.mss()
+    
+    def _grab(self, region: Region, buffer: np.ndarray) -> np.ndarray:
+        x, y, w, h = region
+        shot = self._sct.grab({'left': x, 'top': y, 'width': w, 'height': h})
+        np.copyto(buffer, np.frombuffer(shot.raw, dtype=np.uint8).reshape(h, w, 4))
+        return buffer
+    
+    def close(self):
+        super().close()
+        self._sct.close()
+
+
+class ArrayCapture(CaptureBackend):
+    name = "array"
+    
+    def __init__(self, frames: List[Union[np.ndarray, Path, str]], loop: bool = True):
+        super().__init__()
+        self.frames = [self._load_frame(frame) for frame in frames]
+        self.loop = loop
+        self._index = 0
+    
+    @staticmethod
+    def _load_frame(frame: Union[np.ndarray, Path, str]) -> np.ndarray:
+        if isinstance(frame, np.ndarray):
+            return frame
+        
+        img_array = np.fromfile(str(frame), dtype=np.uint8)
+        image = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"无法解码帧图像: {frame}")
+        return image
+    
+    def _grab(self, region: Region, buffer: np.ndarray) -> np.ndarray:
+        if not self.frames:
+            raise RuntimeError("没有可用的帧")
+        
+        frame = self.frames[self._index]
+        if self._index + 1 < len(self.frames):
+            self._index += 1
+        elif self.loop:
+            self._index = 0
+        
+        x, y, w, h = region
+        if frame.shape[:2] != (h, w):
+            frame = frame[y:y+h, x:x+w]
+        
+        if len(frame.shape) == 2:
+            cv2.cvtColor(frame, cv2.COLOR_GRAY2BGRA, dst=buffer)
+        elif frame.shape[2] == 3:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA, dst=buffer)
+        else:
+            np.copyto(buffer, frame)
+        return buffer
+
+
+CAPTURE_BACKENDS = {
+    'pyautogui': PyAutoGuiCapture,
+    'mss': MssCapture,
+}
+
+
+def create_capture_backend(name: str = 'auto') -> CaptureBackend:
+    if name == 'auto':
+        try:
+            return MssCapture()
+        except Exception as e:
+            logger.info(f"mss 截图不可用, 使用 pyautogui: {e}")
+            return PyAutoGuiCapture()
+    
+    if name not in CAPTURE_BACKENDS:
+        raise ValueError(f"未知的截图后端: {name}")
+    
+    return CAPTURE_BACKENDS[name]()
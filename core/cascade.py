@@ -0,0 +1,37 @@
+from typing import Dict, Any
+import threading
+
+
+class CascadeStats:
+    STAGES = ('color', 'hash', 'ncc', 'castable')
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset_stats()
+    
+    def record(self, stage: str, evaluated: int, eliminated: int, seconds: float):
+        # 多个监控区域可能在线程池中并行匹配
+        with self._lock:
+            stats = self._stages[stage]
+            stats['evaluated'] += evaluated
+            stats['eliminated'] += eliminated
+            stats['seconds'] += seconds
+            stats['calls'] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        result = {}
+        for stage, stats in self._stages.items():
+            result[stage] = {
+                'evaluated': stats['evaluated'],
+                'eliminated': stats['eliminated'],
+                'elimination_ratio': stats['eliminated'] / stats['evaluated'] if stats['evaluated'] else 0.0,
+                'total_ms': stats['seconds'] * 1000,
+                'avg_ms': stats['seconds'] * 1000 / stats['calls'] if stats['calls'] else 0.0,
+            }
+        return result
+    
+    def reset_stats(self):
+        self._stages = {
+            stage: {'evaluated': 0, 'eliminated': 0, 'seconds': 0.0, 'calls': 0}
+            for stage in self.STAGES
+        }
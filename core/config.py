@@ -1,11 +1,20 @@
 from dataclasses import dataclass, field, asdict
 from pathlib import Path
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Tuple, List, Callable
+import atexit
+import hashlib
+import io
 import json
+import os
 import re
+import threading
+import time
 
+from utils.lazy import lazy_import
 from utils.logger import get_logger
 
+np = lazy_import('numpy')
+
 logger = get_logger()
 
 
@@ -17,6 +26,27 @@ class AppSettings:
     key_press_delay: float = 0.19
     auto_add_skills: bool = True
     new_skill_threshold: float = 0.72
+    capture_backend: str = 'auto'
+    frame_gating: bool = True
+    frame_change_tolerance: int = 8
+    min_scan_rate: float = 1.0
+    max_scan_rate: float = 30.0
+    idle_backoff_ticks: int = 10
+    idle_backoff_factor: float = 2.0
+    pipelined: bool = False
+    roi_tracking: bool = True
+    tracking_radius: int = 2
+    tracking_revalidate_ticks: int = 30
+    template_scales: List[float] = field(default_factory=lambda: [1.0, 0.95, 1.05])
+    hash_size: int = 16
+    fixed_slot: bool = True
+    fixed_slot_jitter: int = 1
+    rotation_prediction: bool = True
+    prediction_margin: float = 0.05
+    color_prefilter: bool = True
+    color_prefilter_threshold: float = 0.5
+    ncc_verify: bool = False
+    ncc_threshold: float = 0.7
     
     def validate(self) -> bool:
         if not 0 < self.scan_interval <= 1:
@@ -29,6 +59,32 @@ class AppSettings:
             raise ValueError("新技能阈值必须在0-1之间")
         if not self.monitor_hotkey:
             raise ValueError("监控热键不能为空")
+        if self.capture_backend not in ('auto', 'mss', 'pyautogui'):
+            raise ValueError("截图后端必须是 auto、mss 或 pyautogui")
+        if not 0 <= self.frame_change_tolerance <= 255:
+            raise ValueError("画面变化容差必须在0-255之间")
+        if not 0 < self.min_scan_rate <= self.max_scan_rate:
+            raise ValueError("扫描频率范围无效")
+        if self.idle_backoff_ticks < 1:
+            raise ValueError("空闲降频帧数必须大于0")
+        if self.idle_backoff_factor < 1:
+            raise ValueError("空闲降频系数不能小于1")
+        if self.tracking_radius < 0:
+            raise ValueError("位置跟踪半径不能为负数")
+        if self.tracking_revalidate_ticks < 1:
+            raise ValueError("位置跟踪复核间隔必须大于0")
+        if not self.template_scales or any(scale <= 0 for scale in self.template_scales):
+            raise ValueError("模板缩放比例必须大于0")
+        if not 4 <= self.hash_size <= 32:
+            raise ValueError("哈希尺寸必须在4-32之间")
+        if not 0 <= self.fixed_slot_jitter <= 4:
+            raise ValueError("固定槽位抖动范围必须在0-4像素之间")
+        if not 0 <= self.prediction_margin < 1:
+            raise ValueError("预测提前结束的分差必须在0-1之间")
+        if not 0 <= self.color_prefilter_threshold < 1:
+            raise ValueError("颜色预筛选阈值必须在0-1之间")
+        if not 0 < self.ncc_threshold <= 1:
+            raise ValueError("NCC 校验阈值必须在0-1之间")
         return True
     
     def to_dict(self) -> Dict[str, Any]:
@@ -42,7 +98,28 @@ class AppSettings:
             scan_interval=data.get('scan_interval', 0.33),
             key_press_delay=data.get('key_press_delay', 0.19),
             auto_add_skills=data.get('auto_add_skills', True),
-            new_skill_threshold=data.get('new_skill_threshold', 0.72)
+            new_skill_threshold=data.get('new_skill_threshold', 0.72),
+            capture_backend=data.get('capture_backend', 'auto'),
+            frame_gating=data.get('frame_gating', True),
+            frame_change_tolerance=data.get('frame_change_tolerance', 8),
+            min_scan_rate=data.get('min_scan_rate', 1.0),
+            max_scan_rate=data.get('max_scan_rate', 30.0),
+            idle_backoff_ticks=data.get('idle_backoff_ticks', 10),
+            idle_backoff_factor=data.get('idle_backoff_factor', 2.0),
+            pipelined=data.get('pipelined', False),
+            roi_tracking=data.get('roi_tracking', True),
+            tracking_radius=data.get('tracking_radius', 2),
+            tracking_revalidate_ticks=data.get('tracking_revalidate_ticks', 30),
+            template_scales=list(data.get('template_scales', [1.0, 0.95, 1.05])),
+            hash_size=data.get('hash_size', 16),
+            fixed_slot=data.get('fixed_slot', True),
+            fixed_slot_jitter=data.get('fixed_slot_jitter', 1),
+            rotation_prediction=data.get('rotation_prediction', True),
+            prediction_margin=data.get('prediction_margin', 0.05),
+            color_prefilter=data.get('color_prefilter', True),
+            color_prefilter_threshold=data.get('color_prefilter_threshold', 0.5),
+            ncc_verify=data.get('ncc_verify', False),
+            ncc_threshold=data.get('ncc_threshold', 0.7)
         )
 
 
@@ -78,12 +155,47 @@ class IconBindingData:
         )
 
 
+@dataclass
+class MonitorRegion:
+    name: str
+    rect: Tuple[int, int, int, int]
+    role: str = 'preview'
+    bindings: List[str] = field(default_factory=list)
+    
+    ROLES = ('cast', 'preview')
+    
+    def __post_init__(self):
+        if self.role not in self.ROLES:
+            raise ValueError(f"监控区域用途必须是 cast 或 preview: {self.name}")
+    
+    def accepts(self, binding_name: str) -> bool:
+        # 没有指定技能子集时匹配全部技能
+        return not self.bindings or binding_name in self.bindings
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'rect': list(self.rect),
+            'role': self.role,
+            'bindings': list(self.bindings)
+        }
+    
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> 'MonitorRegion':
+        return cls(
+            name=name,
+            rect=tuple(data['rect']),
+            role=data.get('role', 'preview'),
+            bindings=list(data.get('bindings', []))
+        )
+
+
 @dataclass
 class SpecConfig:
     spec_name: str
     monitor_region: Optional[Tuple[int, int, int, int]] = None
     settings: AppSettings = field(default_factory=AppSettings)
     icon_bindings: Dict[str, IconBindingData] = field(default_factory=dict)
+    regions: Dict[str, MonitorRegion] = field(default_factory=dict)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -92,6 +204,10 @@ class SpecConfig:
             'icon_bindings': {
                 name: binding.to_dict() 
                 for name, binding in self.icon_bindings.items()
+            },
+            'regions': {
+                name: region.to_dict()
+                for name, region in self.regions.items()
             }
         }
     
@@ -110,16 +226,211 @@ class SpecConfig:
             for name, binding_data in bindings_data.items()
         }
         
+        regions_data = data.get('regions', {})
+        regions = {
+            name: MonitorRegion.from_dict(name, region_data)
+            for name, region_data in regions_data.items()
+        }
+        
         return cls(
             spec_name=spec_name,
             monitor_region=monitor_region,
             settings=settings,
-            icon_bindings=icon_bindings
+            icon_bindings=icon_bindings,
+            regions=regions
         )
 
 
+def atomic_write(path: Path, data: bytes):
+    # 先写同目录下的临时文件再改名替换, 中途崩溃不会留下写了一半的文件
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            temp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def json_bytes(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+@dataclass
+class _WriteJob:
+    render: Callable[[], Optional[bytes]]
+    due: float
+    callbacks: List[Callable[[bool], None]] = field(default_factory=list)
+
+
+class ConfigWriter:
+    # 单个后台线程负责所有写文件: 同一路径在合并窗口内的多次提交只写最后一次,
+    # 内容与上次写入的相同时不写; 退出时写出所有未完成的提交
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self._pending: Dict[Path, _WriteJob] = {}
+        self._written: Dict[Path, str] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._busy = False
+        self._flush_requested = False
+        self._closed = False
+        self._exit_registered = False
+        
+        self.request_count = 0
+        self.coalesced_count = 0
+        self.write_count = 0
+        self.unchanged_count = 0
+        self.failure_count = 0
+    
+    def submit(
+        self,
+        path: Path,
+        render: Callable[[], Optional[bytes]],
+        done: Optional[Callable[[bool], None]] = None,
+        delay: Optional[float] = None
+    ):
+        # render 在写入线程中调用, 编码 PNG 等耗时工作也不占用调用方线程;
+        # 合并窗口从第一次提交开始计算, 持续的修改也不会让写入无限推迟
+        with self._cond:
+            self.request_count += 1
+            job = self._pending.get(path)
+            if job is None:
+                job = _WriteJob(render, time.monotonic() + (self.delay if delay is None else delay))
+                self._pending[path] = job
+            else:
+                job.render = render
+                self.coalesced_count += 1
+            if done is not None:
+                job.callbacks.append(done)
+            
+            if self._thread is None:
+                self._closed = False
+                self._thread = threading.Thread(target=self._run, name="ConfigWriter", daemon=True)
+                self._thread.start()
+                if not self._exit_registered:
+                    atexit.register(self.close)
+                    self._exit_registered = True
+            self._cond.notify_all()
+    
+    def cancel(self, predicate: Callable[[Path], bool]):
+        with self._cond:
+            for path in [path for path in self._pending if predicate(path)]:
+                del self._pending[path]
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        # 不再等待合并窗口, 立即写出并等待全部完成
+        with self._cond:
+            # 只在有待写入时跳过合并窗口, 空闲时的 flush 不影响之后的提交
+            if self._pending:
+                self._flush_requested = True
+                self._cond.notify_all()
+            flushed = self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+            if not self._pending:
+                self._flush_requested = False
+            return flushed
+    
+    def close(self, timeout: Optional[float] = 5.0) -> bool:
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        return flushed
+    
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    self._thread = None
+                    return
+                
+                now = time.monotonic()
+                if self._flush_requested or self._closed:
+                    due = list(self._pending)
+                else:
+                    due = [path for path, job in self._pending.items() if job.due <= now]
+                    if not due:
+                        self._cond.wait(min(job.due for job in self._pending.values()) - now)
+                        continue
+                
+                jobs = [(path, self._pending.pop(path)) for path in due]
+                if not self._pending:
+                    self._flush_requested = False
+                self._busy = True
+            
+            for path, job in jobs:
+                success = self._write(path, job.render)
+                for callback in job.callbacks:
+                    try:
+                        callback(success)
+                    except Exception as e:
+                        logger.error(f"写入回调出错 {path}: {e}")
+            
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+    
+    def _write(self, path: Path, render: Callable[[], Optional[bytes]]) -> bool:
+        try:
+            data = render()
+            if data is None:
+                logger.error(f"无法生成文件内容: {path}")
+                self.failure_count += 1
+                return False
+            
+            digest = hashlib.sha1(data).hexdigest()
+            if path.exists():
+                previous = self._written.get(path)
+                if previous is None:
+                    previous = hashlib.sha1(path.read_bytes()).hexdigest()
+                if previous == digest:
+                    self._written[path] = digest
+                    self.unchanged_count += 1
+                    return True
+            
+            atomic_write(path, data)
+            self._written[path] = digest
+            self.write_count += 1
+            logger.debug(f"已写入: {path}")
+            return True
+        except Exception as e:
+            logger.error(f"写入文件失败 {path}: {e}")
+            self.failure_count += 1
+            return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'requests': self.request_count,
+                'coalesced': self.coalesced_count,
+                'writes': self.write_count,
+                'unchanged': self.unchanged_count,
+                'failures': self.failure_count,
+                'pending': len(self._pending),
+                'write_ratio': self.write_count / self.request_count if self.request_count else 0.0,
+            }
+
+
 class ConfigManager:
-    def __init__(self, config_dir: Optional[Path] = None, template_dir: Optional[Path] = None):
+    def __init__(
+        self,
+        config_dir: Optional[Path] = None,
+        template_dir: Optional[Path] = None,
+        save_delay: float = 0.2,
+        history_delay: float = 2.0
+    ):
         self.base_dir = Path(__file__).parent.parent
         self.config_dir = config_dir or self.base_dir / "configs"
         self.template_dir = template_dir or self.base_dir / "templates"
@@ -130,6 +441,10 @@ class ConfigManager:
         
         self._current_spec: Optional[str] = None
         self._current_config: Optional[SpecConfig] = None
+        self._saved_mtimes: Dict[str, int] = {}
+        # 窗口位置和上次配置变化频繁 (拖动窗口、逐个字段修改设置), 使用更长的合并窗口
+        self.history_delay = history_delay
+        self.writer = ConfigWriter(save_delay)
     
     def get_available_specs(self) -> list[str]:
         specs = []
@@ -143,6 +458,14 @@ class ConfigManager:
         return config_path.exists()
     
     def load_spec(self, spec_name: str) -> Optional[SpecConfig]:
+        config = self.read_spec(spec_name)
+        if config is not None:
+            self.set_current(config)
+            logger.info(f"成功加载配置: {spec_name}")
+        return config
+    
+    def read_spec(self, spec_name: str) -> Optional[SpecConfig]:
+        # 只读取不切换当前配置, 后台预加载使用
         config_path = self.config_dir / f"{spec_name}.json"
         
         if not config_path.exists():
@@ -153,51 +476,83 @@ class ConfigManager:
             with open(config_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
             
-            config = SpecConfig.from_dict(spec_name, data)
-            self._current_spec = spec_name
-            self._current_config = config
-            
-            logger.info(f"成功加载配置: {spec_name}")
-            return config
-            
+            return SpecConfig.from_dict(spec_name, data)
+        
         except Exception as e:
             logger.error(f"加载配置失败 {spec_name}: {e}")
             return None
     
-    def save_spec(self, config: SpecConfig) -> bool:
-        config_path = self.config_dir / f"{config.spec_name}.json"
-        
+    def set_current(self, config: SpecConfig):
+        self._current_spec = config.spec_name
+        self._current_config = config
+    
+    def get_spec_mtime(self, spec_name: str) -> int:
         try:
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(config.to_dict(), f, ensure_ascii=False, indent=2)
-            
-            self._current_spec = config.spec_name
-            self._current_config = config
-            
-            logger.info(f"配置已保存: {config_path}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"保存配置失败: {e}")
-            return False
+            return (self.config_dir / f"{spec_name}.json").stat().st_mtime_ns
+        except OSError:
+            return 0
+    
+    def is_modified_externally(self, spec_name: str, loaded_mtime: int) -> bool:
+        # 读取后文件又被修改过, 且不是本进程自己写入的
+        mtime = self.get_spec_mtime(spec_name)
+        return mtime != loaded_mtime and mtime != self._saved_mtimes.get(spec_name)
+    
+    def save_spec(self, config: SpecConfig, wait: bool = False) -> bool:
+        # 调用时生成快照, 由写入线程落盘; wait=True 时等到文件写完 (新建配置后马上要读取)
+        spec_name = config.spec_name
+        config_path = self.config_dir / f"{spec_name}.json"
+        data = config.to_dict()
+        self.set_current(config)
+        
+        result = {'success': True}
+        
+        def done(success: bool):
+            result['success'] = success
+            if success:
+                self._saved_mtimes[spec_name] = self.get_spec_mtime(spec_name)
+                logger.info(f"配置已保存: {config_path}")
+            else:
+                logger.error(f"保存配置失败: {spec_name}")
+        
+        self.writer.submit(config_path, lambda: json_bytes(data), done)
+        if wait:
+            self.writer.flush()
+            return result['success']
+        return True
     
     def delete_spec(self, spec_name: str) -> bool:
         config_path = self.config_dir / f"{spec_name}.json"
         
+        # 丢弃尚未写出的文件并等待正在写的完成, 避免删除后又被写回
+        spec_files = {config_path, self.get_rotation_path(spec_name), self.get_template_cache_path(spec_name)}
+        self.writer.cancel(
+            lambda path: path in spec_files or (path.parent == self.template_dir and path.name.startswith(f"{spec_name}_"))
+        )
+        self.writer.flush()
+        
         try:
             if config_path.exists():
                 config_path.unlink()
             
+            rotation_path = self.get_rotation_path(spec_name)
+            if rotation_path.exists():
+                rotation_path.unlink()
+            
+            cache_path = self.get_template_cache_path(spec_name)
+            if cache_path.exists():
+                cache_path.unlink()
+            
             for template_file in self.template_dir.glob(f"{spec_name}_*.png"):
                 template_file.unlink()
             
+            self._saved_mtimes.pop(spec_name, None)
             if self._current_spec == spec_name:
                 self._current_spec = None
                 self._current_config = None
             
             logger.info(f"已删除配置: {spec_name}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"删除配置失败: {e}")
             return False
@@ -206,6 +561,67 @@ class ConfigManager:
         safe_name = "".join(c for c in binding_name if c.isalnum() or c in ('_', '-'))
         return self.template_dir / f"{spec_name}_{safe_name}.png"
     
+    def get_rotation_path(self, spec_name: str) -> Path:
+        # 不使用 .json 后缀, 避免被 get_available_specs 当成配置
+        return self.config_dir / f"{spec_name}.rotation"
+    
+    def load_rotation(self, spec_name: str) -> Dict[str, Dict[str, int]]:
+        rotation_path = self.get_rotation_path(spec_name)
+        if not rotation_path.exists():
+            return {}
+        
+        try:
+            with open(rotation_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"加载技能转移表失败 {spec_name}: {e}")
+            return {}
+    
+    def save_rotation(
+        self,
+        spec_name: str,
+        transitions: Dict[str, Dict[str, int]],
+        done: Optional[Callable[[bool], None]] = None
+    ):
+        self.writer.submit(self.get_rotation_path(spec_name), lambda: json_bytes(transitions), done)
+    
+    def save_template(
+        self,
+        spec_name: str,
+        binding_name: str,
+        render: Callable[[], Optional[bytes]],
+        done: Optional[Callable[[bool], None]] = None
+    ):
+        self.writer.submit(self.get_template_path(spec_name, binding_name), render, done)
+    
+    def get_template_cache_path(self, spec_name: str) -> Path:
+        # 由 PNG 生成的编译缓存, 删除后下次加载时重建
+        return self.template_dir / f"{spec_name}.cache.npz"
+    
+    def load_template_cache(self, spec_name: str) -> Dict[str, Any]:
+        cache_path = self.get_template_cache_path(spec_name)
+        if not cache_path.exists():
+            return {}
+        
+        try:
+            # 一次读入整个文件, 数组都在内存中, 关闭文件后仍然有效
+            with np.load(cache_path, allow_pickle=False) as data:
+                return {key: data[key] for key in data.files}
+        except Exception as e:
+            logger.warning(f"模板缓存无法读取, 将重新生成 {spec_name}: {e}")
+            return {}
+    
+    def save_template_cache(self, spec_name: str, arrays: Dict[str, Any]):
+        def render() -> bytes:
+            buffer = io.BytesIO()
+            np.savez(buffer, **arrays)
+            return buffer.getvalue()
+        
+        self.writer.submit(self.get_template_cache_path(spec_name), render)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return self.writer.flush(timeout)
+    
     def load_history(self) -> Dict[str, Any]:
         if not self.history_file.exists():
             return {}
@@ -218,9 +634,16 @@ class ConfigManager:
             return {}
     
     def save_history(self, history: Dict[str, Any]) -> bool:
+        # 在调用方线程生成快照后再提交, 合并窗口内的多次调用只写最后一次, 内容没变时不写;
+        # 返回值表示已提交 (包括之后因内容相同而跳过写入), 无法序列化或提交失败时返回 False
         try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, ensure_ascii=False, indent=2)
+            data = json_bytes(history)
+            
+            def done(success: bool):
+                if not success:
+                    logger.error(f"保存历史配置失败: {self.history_file}")
+            
+            self.writer.submit(self.history_file, lambda: data, done, delay=self.history_delay)
             return True
         except Exception as e:
             logger.error(f"保存历史配置失败: {e}")
@@ -0,0 +1,172 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple, Union
+import queue
+import threading
+import time
+import numpy as np
+
+from utils.lazy import lazy_import
+from utils.logger import get_logger
+
+keyboard = lazy_import('keyboard')
+
+logger = get_logger()
+
+KeyCode = Union[int, str]
+
+
+@dataclass(frozen=True)
+class KeyChord:
+    hotkey: str
+    modifiers: Tuple[str, ...]
+    key: str
+    
+    @classmethod
+    def parse(cls, hotkey: str) -> 'KeyChord':
+        # "alt+6" -> 修饰键 ("alt",) + 主键 "6"; 单独的 "+" 或以 "++" 结尾时主键就是 "+"
+        if hotkey.endswith('++') or hotkey == '+':
+            head, key = hotkey[:-2], '+'
+        elif '+' in hotkey:
+            head, key = hotkey.rsplit('+', 1)
+        else:
+            head, key = '', hotkey
+        
+        modifiers = tuple(part.strip() for part in head.split('+') if part.strip())
+        return cls(hotkey=hotkey, modifiers=modifiers, key=key)
+
+
+class InputDispatcher:
+    MODIFIER_DELAY = 0.01
+    
+    def __init__(self, maxsize: int = 8, history: int = 256):
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._in_flight: set = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._scan_codes: Dict[str, KeyCode] = {}
+        self._latencies: deque = deque(maxlen=history)
+        
+        self.submitted_count = 0
+        self.coalesced_count = 0
+        self.dropped_count = 0
+        self.completed_count = 0
+        self.failed_count = 0
+    
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="InputDispatcher", daemon=True)
+            self._thread.start()
+    
+    def stop(self, timeout: float = 1.0):
+        thread = self._thread
+        if thread is None:
+            return
+        
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("按键队列未能及时清空")
+        thread.join(timeout)
+        self._thread = None
+    
+    def submit(self, chord: KeyChord, hold: float) -> bool:
+        self.start()
+        
+        with self._lock:
+            # 同一按键还在队列中或正在按下时直接合并, 避免重复释放
+            if chord in self._in_flight:
+                self.coalesced_count += 1
+                return False
+            
+            try:
+                self._queue.put_nowait((chord, hold, time.perf_counter()))
+            except queue.Full:
+                self.dropped_count += 1
+                logger.warning(f"按键队列已满, 丢弃: {chord.hotkey}")
+                return False
+            
+            self._in_flight.add(chord)
+            self.submitted_count += 1
+            return True
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            
+            chord, hold, enqueued = item
+            try:
+                self._send(chord, hold)
+                self._latencies.append(time.perf_counter() - enqueued)
+                self.completed_count += 1
+            except Exception as e:
+                self.failed_count += 1
+                logger.error(f"按键模拟失败 [{chord.hotkey}]: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight.discard(chord)
+    
+    def _send(self, chord: KeyChord, hold: float):
+        modifiers = [self._resolve(name) for name in chord.modifiers]
+        key = self._resolve(chord.key)
+        
+        for modifier in modifiers:
+            keyboard.press(modifier)
+        if modifiers:
+            time.sleep(self.MODIFIER_DELAY)
+        
+        keyboard.press(key)
+        try:
+            time.sleep(hold)
+        finally:
+            keyboard.release(key)
+            for modifier in reversed(modifiers):
+                keyboard.release(modifier)
+    
+    def _resolve(self, name: str) -> KeyCode:
+        # 按键名只解析一次扫描码, 之后直接按扫描码发送
+        code = self._scan_codes.get(name)
+        if code is None:
+            try:
+                code = keyboard.key_to_scan_codes(name)[0]
+            except Exception:
+                code = name
+            self._scan_codes[name] = code
+        return code
+    
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            'submitted': self.submitted_count,
+            'coalesced': self.coalesced_count,
+            'dropped': self.dropped_count,
+            'completed': self.completed_count,
+            'failed': self.failed_count,
+            'pending': self.pending,
+            'latency_avg_ms': 0.0,
+            'latency_p95_ms': 0.0,
+            'latency_max_ms': 0.0,
+        }
+        
+        if self._latencies:
+            latencies = np.array(self._latencies) * 1000
+            stats['latency_avg_ms'] = float(latencies.mean())
+            stats['latency_p95_ms'] = float(np.percentile(latencies, 95))
+            stats['latency_max_ms'] = float(latencies.max())
+        
+        return stats
+    
+    def reset_stats(self):
+        self._latencies.clear()
+        self.submitted_count = 0
+        self.coalesced_count = 0
+        self.dropped_count = 0
+        self.completed_count = 0
+        self.failed_count = 0
@@ -0,0 +1,55 @@
+from typing import Optional, Dict, Any
+import numpy as np
+
+from utils.lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+
+
+class FrameGate:
+    def __init__(self, tolerance: int = 8):
+        self.tolerance = tolerance
+        self._reference: Optional[np.ndarray] = None
+        self._key: Any = None
+        self.frame_count = 0
+        self.skipped_count = 0
+    
+    def is_unchanged(self, gray: np.ndarray, key: Any = None) -> bool:
+        # 与上一次完整匹配时的帧比较, 而不是与上一帧比较, 避免缓慢渐变被逐帧容差吞掉
+        self.frame_count += 1
+        
+        reference = self._reference
+        if reference is None or reference.shape != gray.shape or key != self._key:
+            return False
+        
+        if cv2.norm(gray, reference, cv2.NORM_INF) > self.tolerance:
+            return False
+        
+        self.skipped_count += 1
+        return True
+    
+    def update(self, gray: np.ndarray, key: Any = None):
+        if self._reference is None or self._reference.shape != gray.shape:
+            self._reference = gray.copy()
+        else:
+            np.copyto(self._reference, gray)
+        self._key = key
+    
+    def reset(self):
+        self._reference = None
+        self._key = None
+    
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped_count / self.frame_count if self.frame_count else 0.0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'frames': self.frame_count,
+            'skipped': self.skipped_count,
+            'skip_ratio': self.skip_ratio,
+        }
+    
+    def reset_stats(self):
+        self.frame_count = 0
+        self.skipped_count = 0
@@ -0,0 +1,205 @@
+from typing import Optional, Dict, Any
+from pathlib import Path
+import json
+import sys
+import threading
+import time
+
+from core.config import ConfigManager
+from core.processor import SkillProcessor
+from core.pipeline import SkillPipeline
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+class HeadlessRunner:
+    def __init__(
+        self,
+        spec_name: str,
+        duration: Optional[float] = None,
+        stats_path: Optional[str] = None,
+        config_manager: Optional[ConfigManager] = None
+    ):
+        self.spec_name = spec_name
+        self.duration = duration
+        self.stats_path = stats_path
+        self.config_manager = config_manager or ConfigManager()
+        self.processor = SkillProcessor(self.config_manager)
+        
+        self.running = False
+        self.pipeline: Optional[SkillPipeline] = None
+        self._thread: Optional[threading.Thread] = None
+        self._exit = threading.Event()
+        self.started = threading.Event()
+        self._toggle_lock = threading.Lock()
+        self._hotkey = None
+        
+        self.started_at = 0.0
+        self.tick_count = 0
+        self.cast_count = 0
+        self.pipeline_stats: Optional[Dict[str, Any]] = None
+    
+    def run(self) -> int:
+        if not self.processor.load_config(self.spec_name):
+            return 1
+        
+        if not self.processor.monitor_region:
+            history = self.config_manager.load_history()
+            if history.get("last_spec") == self.spec_name and history.get("monitor_region"):
+                self.processor.monitor_region = tuple(history["monitor_region"])
+        
+        if not self.processor.monitor_region:
+            logger.error(f"配置 {self.spec_name} 没有设置监控区域")
+            return 1
+        
+        self._register_hotkey()
+        self.started_at = time.perf_counter()
+        self.start()
+        self.started.set()
+        
+        try:
+            # 主线程只等待退出, 监控在独立线程中按调度器节拍运行
+            self._exit.wait(self.duration)
+        except KeyboardInterrupt:
+            logger.info("收到中断信号")
+        finally:
+            self.stop()
+            self._unregister_hotkey()
+            self.processor.shutdown()
+            # 最后输出统计信息, 之后不再有日志
+            self._write_stats()
+        
+        return 0
+    
+    def start(self):
+        with self._toggle_lock:
+            if self.running:
+                return
+            
+            self.running = True
+            self.processor.start()
+            
+            if self.processor.settings.pipelined:
+                self.pipeline = SkillPipeline(self.processor)
+                self.pipeline.start()
+            else:
+                self._thread = threading.Thread(target=self._monitor_loop, name="HeadlessMonitor", daemon=True)
+                self._thread.start()
+            
+            logger.info(f"无界面监控已启动: {self.spec_name}")
+    
+    def stop(self):
+        with self._toggle_lock:
+            if not self.running:
+                return
+            
+            self.running = False
+            self.processor.stop()
+            
+            if self.pipeline is not None:
+                # 每次启动都会新建流水线, 停止时把它的计数并入总数
+                self.pipeline.stop()
+                stats = self.pipeline.get_stats()
+                self.tick_count += stats['acted']
+                self.cast_count += stats['casts']
+                self.pipeline_stats = stats
+                self.pipeline = None
+            if self._thread is not None:
+                self._thread.join(1.0)
+                self._thread = None
+            
+            logger.info("无界面监控已停止")
+    
+    def toggle(self):
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+    
+    def request_exit(self):
+        self._exit.set()
+    
+    def _monitor_loop(self):
+        # 与主窗口的监控循环相同, 但不检测新技能: 无界面时无法为新技能分配按键
+        scheduler = self.processor.scheduler
+        scheduler.configure(self.processor.settings)
+        scheduler.start()
+        
+        while self.running and scheduler.wait():
+            try:
+                scheduler.configure(self.processor.settings)
+                result = self.processor.tick()
+                
+                self.tick_count += 1
+                if result.cast is not None:
+                    self.cast_count += 1
+                
+                scheduler.advance(idle=result.idle)
+            except Exception as e:
+                logger.error(f"监控循环出错: {e}")
+                self.running = False
+                self.processor.stop()
+                break
+    
+    def _register_hotkey(self):
+        # 与界面相同的监控热键用于暂停/继续; keyboard 在部分系统上需要管理员权限, 失败时仅记录警告
+        hotkey = self.processor.settings.monitor_hotkey
+        try:
+            import keyboard
+            self._hotkey = keyboard.add_hotkey(hotkey, self.toggle)
+            logger.info(f"监控热键: {hotkey}")
+        except Exception as e:
+            logger.warning(f"无法注册监控热键 {hotkey}: {e}")
+    
+    def _unregister_hotkey(self):
+        if self._hotkey is None:
+            return
+        
+        try:
+            import keyboard
+            keyboard.remove_hotkey(self._hotkey)
+        except Exception:
+            pass
+        self._hotkey = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        ticks, casts = self.tick_count, self.cast_count
+        pipeline_stats = self.pipeline_stats
+        if self.pipeline is not None:
+            pipeline_stats = self.pipeline.get_stats()
+            ticks += pipeline_stats['acted']
+            casts += pipeline_stats['casts']
+        
+        stats: Dict[str, Any] = {
+            'spec': self.spec_name,
+            'elapsed_s': elapsed,
+            'ticks': ticks,
+            'casts': casts,
+        }
+        if pipeline_stats is not None:
+            stats['pipeline'] = pipeline_stats
+        stats.update(self.processor.get_stats())
+        return stats
+    
+    def _write_stats(self):
+        if not self.stats_path:
+            return
+        
+        text = json.dumps(
+            self.get_stats(),
+            ensure_ascii=False,
+            indent=2,
+            default=lambda value: value.item() if hasattr(value, 'item') else str(value)
+        )
+        
+        if self.stats_path == '-':
+            print(text, file=sys.stdout)
+            return
+        
+        try:
+            Path(self.stats_path).write_text(text, encoding='utf-8')
+            logger.info(f"统计信息已写入: {self.stats_path}")
+        except Exception as e:
+            logger.error(f"写入统计信息失败: {e}")
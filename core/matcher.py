@@ -1,11 +1,14 @@
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Optional, Tuple, List
-import cv2
+from typing import Optional, Tuple, List, Union
 import numpy as np
 from pathlib import Path
 
+from utils.lazy import lazy_import
 from utils.logger import get_logger
 
+cv2 = lazy_import('cv2')
+
 logger = get_logger()
 
 
@@ -16,14 +19,88 @@ class MatchResult:
     location: Optional[Tuple[int, int]] = None
 
 
+@dataclass
+class ColorSignature:
+    mean: np.ndarray
+    hue_hist: np.ndarray
+    
+    def similarity(self, other: 'ColorSignature') -> float:
+        return float(self.similarities(other.mean[None], other.hue_hist[None])[0])
+    
+    def similarities(self, means: np.ndarray, hue_hists: np.ndarray) -> np.ndarray:
+        # 与 (N, 3) 均值、(N, bins) 直方图逐行比较, 均值颜色与色相直方图两者取较小值;
+        # 两者都几乎没有饱和像素时只比较均值
+        mean_similarity = 1 - np.abs(means - self.mean).max(axis=1) / 255
+        
+        mass = np.maximum(hue_hists.sum(axis=1), self.hue_hist.sum())
+        overlap = np.minimum(hue_hists, self.hue_hist).sum(axis=1)
+        hist_similarity = np.divide(overlap, mass, out=np.ones_like(mass), where=mass >= 0.05)
+        return np.minimum(mean_similarity, hist_similarity)
+
+
+class PerceptualHash:
+    def __init__(self, words: np.ndarray, hash_size: int, bits: Optional[np.ndarray] = None):
+        self.words = words
+        self.hash_size = hash_size
+        self._bits = bits
+        self._hash_str: Optional[str] = None
+    
+    @property
+    def bit_count(self) -> int:
+        return self.hash_size * self.hash_size
+    
+    @property
+    def bits(self) -> np.ndarray:
+        if self._bits is None:
+            unpacked = np.unpackbits(self.words.view(np.uint8))[:self.bit_count]
+            self._bits = unpacked.astype(bool).reshape(self.hash_size, self.hash_size)
+        return self._bits
+    
+    @property
+    def hash_str(self) -> str:
+        # 字符串形式只在需要记录日志时生成
+        if self._hash_str is None:
+            self._hash_str = (self.bits.reshape(-1).view(np.uint8) + ord('0')).tobytes().decode('ascii')
+        return self._hash_str
+    
+    def distance(self, other: 'PerceptualHash') -> int:
+        if len(self.words) == 1:
+            return int(np.bitwise_count(self.words[0] ^ other.words[0]))
+        return int(np.bitwise_count(self.words ^ other.words).sum())
+    
+    def __str__(self) -> str:
+        return self.hash_str
+
+
 class ImageMatcher:
-    TM_CCOEFF_NORMED = cv2.TM_CCOEFF_NORMED
-    TM_CCORR_NORMED = cv2.TM_CCORR_NORMED
-    TM_SQDIFF_NORMED = cv2.TM_SQDIFF_NORMED
+    # 与 cv2.TM_* 取值相同, 定义类时不必加载 cv2
+    TM_CCOEFF_NORMED = 5
+    TM_CCORR_NORMED = 3
+    TM_SQDIFF_NORMED = 1
+    
+    RESIZE_COEF_BITS = 11
+    WINDOW_CHUNK_ROWS = 32
+    BIT_WEIGHTS = np.array([128, 64, 32, 16, 8, 4, 2, 1], dtype=np.uint8)
+    PYRAMID_MIN_TEMPLATE = 16
+    PYRAMID_REFINE_RADIUS = 2
+    # 最粗一层前两个峰的得分差小于此值时, 降采样已无法区分两者, 改为全分辨率匹配
+    PYRAMID_AMBIGUITY = 0.02
+    SCALED_CACHE_SIZE = 256
+    HUE_BINS = 12
+    DEFAULT_SCALES = (1.0, 0.95, 1.05)
     
     def __init__(self, default_threshold: float = 0.90):
         self.default_threshold = default_threshold
         self._template_cache: dict[str, np.ndarray] = {}
+        self._window_kernel_exact: dict[Tuple[int, int, int], bool] = {}
+        self._resize_taps: dict[Tuple[int, int, bool], Tuple[np.ndarray, ...]] = {}
+        self._template_pyramids: dict[int, Tuple[np.ndarray, List[np.ndarray]]] = {}
+        self._scaled_templates: OrderedDict[Tuple[int, float, int], Tuple[np.ndarray, np.ndarray]] = OrderedDict()
+        self._winning_scales: dict[int, Tuple[np.ndarray, float]] = {}
+        # 未指定缩放比例时使用的比例, 由当前配置的 template_scales 设置
+        self.scales: Tuple[float, ...] = self.DEFAULT_SCALES
+        self.pyramid_search_count = 0
+        self.pyramid_fallback_count = 0
     
     def load_template(self, path: Path) -> Optional[np.ndarray]:
         cache_key = str(path)
@@ -38,8 +115,7 @@ class ImageMatcher:
         try:
             with open(path, 'rb') as f:
                 img_data = f.read()
-            img_array = np.frombuffer(img_data, np.uint8)
-            template = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+            template = self.decode_template(img_data)
             
             if template is None:
                 logger.error(f"无法解码模板图像: {path}")
@@ -48,29 +124,37 @@ class ImageMatcher:
             self._template_cache[cache_key] = template
             logger.debug(f"加载模板: {path}")
             return template
-            
+        
         except Exception as e:
             logger.error(f"加载模板失败 {path}: {e}")
             return None
     
+    def decode_template(self, data: bytes) -> Optional[np.ndarray]:
+        # imdecode 执行时释放 GIL, 可以在线程池中并行解码
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    
+    def encode_template(self, template: np.ndarray) -> Optional[bytes]:
+        success, encoded_img = cv2.imencode('.png', template)
+        return encoded_img.tobytes() if success else None
+    
     def save_template(self, path: Path, template: np.ndarray) -> bool:
         try:
             path.parent.mkdir(parents=True, exist_ok=True)
             
-            success, encoded_img = cv2.imencode('.png', template)
-            if not success:
+            data = self.encode_template(template)
+            if data is None:
                 logger.error(f"编码模板图像失败: {path}")
                 return False
             
             with open(path, 'wb') as f:
-                f.write(encoded_img.tobytes())
+                f.write(data)
             
             cache_key = str(path)
             self._template_cache[cache_key] = template
             
             logger.debug(f"保存模板: {path}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"保存模板失败 {path}: {e}")
             return False
@@ -91,6 +175,9 @@ class ImageMatcher:
         if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
             return MatchResult(found=False, confidence=0.0)
         
+        if image.ndim != template.ndim or image.shape[2:] != template.shape[2:]:
+            image = self.to_bgr(image) if template.ndim == 3 else self.to_gray(image)
+        
         result = cv2.matchTemplate(image, template, method)
         min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
         
@@ -108,47 +195,231 @@ class ImageMatcher:
             location=location if found else None
         )
     
+    def build_pyramid(self, image: np.ndarray, levels: int) -> List[np.ndarray]:
+        pyramid = [image]
+        for _ in range(levels):
+            pyramid.append(cv2.pyrDown(pyramid[-1]))
+        return pyramid
+    
+    def pyramid_levels(self, template: np.ndarray) -> int:
+        # 最粗一层的模板边长不小于 PYRAMID_MIN_TEMPLATE, 否则粗匹配失去区分度
+        levels = 0
+        size = min(template.shape[:2])
+        while size // 2 >= self.PYRAMID_MIN_TEMPLATE:
+            size //= 2
+            levels += 1
+        return levels
+    
+    def match_template_pyramid(
+        self,
+        image: np.ndarray,
+        template: np.ndarray,
+        threshold: Optional[float] = None,
+        method: int = None,
+        levels: Optional[int] = None,
+        top_k: int = 5,
+        pyramid: Optional[List[np.ndarray]] = None
+    ) -> MatchResult:
+        # 在最粗一层做完整匹配, 取前 top_k 个候选, 逐层放大后只在候选附近重新匹配
+        if method is None:
+            method = self.TM_CCOEFF_NORMED
+        
+        if threshold is None:
+            threshold = self.default_threshold
+        
+        if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+            return MatchResult(found=False, confidence=0.0)
+        
+        if image.ndim != template.ndim or image.shape[2:] != template.shape[2:]:
+            image = self.to_bgr(image) if template.ndim == 3 else self.to_gray(image)
+            pyramid = None
+        
+        if levels is None:
+            levels = self.pyramid_levels(template)
+        if pyramid is not None:
+            levels = min(levels, len(pyramid) - 1)
+        
+        if levels <= 0:
+            return self.match_template(image, template, threshold, method)
+        
+        if pyramid is None:
+            pyramid = self.build_pyramid(image, levels)
+        template_pyramid = self._get_template_pyramid(template, levels)
+        
+        sign = -1 if method == self.TM_SQDIFF_NORMED else 1
+        
+        coarse_image = pyramid[levels]
+        coarse_template = template_pyramid[levels]
+        if (coarse_image.shape[0] < coarse_template.shape[0] or
+                coarse_image.shape[1] < coarse_template.shape[1]):
+            return self.match_template(image, template, threshold, method)
+        
+        scores = sign * cv2.matchTemplate(coarse_image, coarse_template, method)
+        candidates = self._top_candidates(scores, top_k, coarse_template.shape[:2])
+        
+        self.pyramid_search_count += 1
+        if len(candidates) > 1 and candidates[0][0] - candidates[1][0] < self.PYRAMID_AMBIGUITY:
+            self.pyramid_fallback_count += 1
+            return self.match_template(image, template, threshold, method)
+        coarse_best = candidates[0][0]
+        
+        for level in range(levels - 1, -1, -1):
+            level_image = pyramid[level]
+            level_template = template_pyramid[level]
+            tpl_h, tpl_w = level_template.shape[:2]
+            max_y = level_image.shape[0] - tpl_h
+            max_x = level_image.shape[1] - tpl_w
+            radius = self.PYRAMID_REFINE_RADIUS
+            
+            refined = {}
+            for _, (x, y) in candidates:
+                x0 = min(max(2 * x - radius, 0), max_x)
+                y0 = min(max(2 * y - radius, 0), max_y)
+                x1 = min(2 * x + radius, max_x)
+                y1 = min(2 * y + radius, max_y)
+                
+                window = level_image[y0:y1+tpl_h, x0:x1+tpl_w]
+                local = sign * cv2.matchTemplate(window, level_template, method)
+                _, max_val, _, max_loc = cv2.minMaxLoc(local)
+                
+                location = (x0 + max_loc[0], y0 + max_loc[1])
+                refined[location] = max(max_val, refined.get(location, -np.inf))
+            
+            candidates = sorted(
+                ((score, location) for location, score in refined.items()),
+                reverse=True
+            )
+        
+        # 细化后得分明显低于粗匹配时, 粗层的峰可能是近似图标而非原图, 同样改为全分辨率匹配
+        score, location = candidates[0]
+        if score < coarse_best - self.PYRAMID_AMBIGUITY:
+            self.pyramid_fallback_count += 1
+            return self.match_template(image, template, threshold, method)
+        confidence = 1 + score if sign < 0 else score
+        
+        found = confidence >= threshold
+        return MatchResult(
+            found=found,
+            confidence=confidence,
+            location=location if found else None
+        )
+    
+    def _get_template_pyramid(self, template: np.ndarray, levels: int) -> List[np.ndarray]:
+        cached = self._template_pyramids.get(id(template))
+        
+        if cached is None or cached[0] is not template or len(cached[1]) <= levels:
+            cached = (template, self.build_pyramid(template, levels))
+            self._template_pyramids[id(template)] = cached
+        
+        return cached[1]
+    
+    @staticmethod
+    def _top_candidates(
+        scores: np.ndarray,
+        top_k: int,
+        template_size: Tuple[int, int]
+    ) -> List[Tuple[float, Tuple[int, int]]]:
+        # 依次取最大值并抑制其邻域, 避免候选集中在同一个峰上
+        scores = scores.copy()
+        suppress_h = max(1, template_size[0] // 2)
+        suppress_w = max(1, template_size[1] // 2)
+        candidates = []
+        
+        for _ in range(top_k):
+            _, max_val, _, (x, y) = cv2.minMaxLoc(scores)
+            if not np.isfinite(max_val):
+                break
+            candidates.append((max_val, (x, y)))
+            scores[max(0, y - suppress_h):y + suppress_h + 1, max(0, x - suppress_w):x + suppress_w + 1] = -np.inf
+        
+        return candidates
+    
     def match_template_multi_scale(
         self,
         image: np.ndarray,
         template: np.ndarray,
         threshold: Optional[float] = None,
-        scales: Optional[List[float]] = None
+        scales: Optional[List[float]] = None,
+        pyramid: bool = False
     ) -> MatchResult:
         if threshold is None:
             threshold = self.default_threshold
         
         if scales is None:
-            scales = [1.0, 0.95, 1.05]
+            scales = self.scales
+        
+        # 一次会话中界面缩放基本不变, 上次命中的比例优先尝试; 与缩放缓存一样校验模板对象本身,
+        # id 被新数组复用时不沿用旧的比例
+        winning = self._winning_scales.get(id(template))
+        last_scale = winning[1] if winning is not None and winning[0] is template else None
+        if last_scale in scales:
+            scales = [last_scale] + [scale for scale in scales if scale != last_scale]
         
         best_result = MatchResult(found=False, confidence=0.0)
+        image_pyramid = None
         
         for scale in scales:
-            if scale != 1.0:
-                resized_template = cv2.resize(
-                    template,
-                    None,
-                    fx=scale,
-                    fy=scale,
-                    interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
-                )
-            else:
-                resized_template = template
+            resized_template = self.get_scaled_template(template, scale)
             
             if (image.shape[0] < resized_template.shape[0] or 
                 image.shape[1] < resized_template.shape[1]):
                 continue
             
-            result = self.match_template(image, resized_template, threshold)
+            if pyramid:
+                # 图像金字塔每帧只构建一次, 各个缩放比例共用
+                levels = self.pyramid_levels(resized_template)
+                if image_pyramid is None or len(image_pyramid) <= levels:
+                    image_pyramid = self.build_pyramid(image, levels)
+                result = self.match_template_pyramid(
+                    image, resized_template, threshold, levels=levels, pyramid=image_pyramid
+                )
+            else:
+                result = self.match_template(image, resized_template, threshold)
             
             if result.confidence > best_result.confidence:
                 best_result = result
             
             if result.found:
+                self._winning_scales[id(template)] = (template, scale)
                 break
         
         return best_result
     
+    def get_scaled_template(
+        self,
+        template: np.ndarray,
+        scale: float,
+        interpolation: Optional[int] = None
+    ) -> np.ndarray:
+        if scale == 1.0:
+            return template
+        
+        if interpolation is None:
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        
+        key = (id(template), scale, interpolation)
+        cached = self._scaled_templates.get(key)
+        
+        # 缓存以模板对象为键, 同时保存模板引用, 防止对象被回收后 id 被复用
+        if cached is not None and cached[0] is template:
+            self._scaled_templates.move_to_end(key)
+            return cached[1]
+        
+        scaled = cv2.resize(template, None, fx=scale, fy=scale, interpolation=interpolation)
+        self._scaled_templates[key] = (template, scaled)
+        
+        while len(self._scaled_templates) > self.SCALED_CACHE_SIZE:
+            self._scaled_templates.popitem(last=False)
+        
+        return scaled
+    
+    def invalidate_template(self, template: np.ndarray):
+        template_id = id(template)
+        for key in [key for key in self._scaled_templates if key[0] == template_id]:
+            del self._scaled_templates[key]
+        self._template_pyramids.pop(template_id, None)
+        self._winning_scales.pop(template_id, None)
+    
     def match_with_edge_detection(
         self,
         image: np.ndarray,
@@ -158,35 +429,42 @@ class ImageMatcher:
         if threshold is None:
             threshold = self.default_threshold
         
-        image_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
-        template_gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY) if len(template.shape) == 3 else template
+        image_gray = self.to_gray(image)
+        template_gray = self.to_gray(template)
         
         image_edges = cv2.Canny(image_gray, 50, 150)
         template_edges = cv2.Canny(template_gray, 50, 150)
         
         return self.match_template(image_edges, template_edges, threshold)
     
+    def calculate_hash(self, image: np.ndarray, hash_size: int = 16) -> PerceptualHash:
+        gray = self.to_gray(image)
+        
+        resized = cv2.resize(gray, (hash_size + 1, hash_size))
+        diff = resized[:, 1:] > resized[:, :-1]
+        
+        return PerceptualHash(self.pack_hash(diff), hash_size, diff)
+    
     def calculate_perceptual_hash(
         self,
         image: np.ndarray,
         hash_size: int = 16
     ) -> Tuple[np.ndarray, str]:
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
-        
-        resized = cv2.resize(gray, (hash_size + 1, hash_size))
-        diff = resized[:, 1:] > resized[:, :-1]
-        hash_str = ''.join(['1' if b else '0' for b in diff.flatten()])
-        
-        return diff, hash_str
+        phash = self.calculate_hash(image, hash_size)
+        return phash.bits, phash.hash_str
     
     def calculate_hash_similarity(
         self,
-        hash1: np.ndarray,
-        hash2: np.ndarray
+        hash1: Union[np.ndarray, PerceptualHash],
+        hash2: Union[np.ndarray, PerceptualHash]
     ) -> Tuple[float, int]:
+        if isinstance(hash1, PerceptualHash) and isinstance(hash2, PerceptualHash):
+            if hash1.hash_size != hash2.hash_size:
+                return 0.0, hash1.bit_count
+            
+            hamming_distance = hash1.distance(hash2)
+            return 1 - (hamming_distance / hash1.bit_count), hamming_distance
+        
         if hash1.shape != hash2.shape:
             return 0.0, hash1.size
         
@@ -196,32 +474,279 @@ class ImageMatcher:
         
         return similarity, hamming_distance
     
-    def is_skill_castable(self, icon_image: np.ndarray) -> bool:
-        if icon_image is None or icon_image.size == 0:
-            return True
+    def calculate_window_hashes(
+        self,
+        image: np.ndarray,
+        window_size: Tuple[int, int],
+        hash_size: int = 16
+    ) -> np.ndarray:
+        gray = self.to_gray(image)
+        
+        win_h, win_w = window_size
+        rows = gray.shape[0] - win_h + 1
+        cols = gray.shape[1] - win_w + 1
+        
+        if rows <= 0 or cols <= 0:
+            return np.zeros((0, 0, hash_size, hash_size), dtype=bool)
+        
+        if not self._check_window_kernel(win_h, win_w, hash_size):
+            return self._calculate_window_hashes_loop(gray, window_size, hash_size)
+        
+        hashes = np.empty((rows, hash_size, hash_size, cols), dtype=bool)
+        for y, i, resized in self._resize_windows(gray, win_h, win_w, hash_size):
+            np.greater(resized[:, 1:], resized[:, :-1], out=hashes[y:y+len(resized), i])
+        
+        return hashes.transpose(0, 3, 1, 2)
+    
+    def calculate_window_similarities(
+        self,
+        window_hashes: np.ndarray,
+        icon_hash: np.ndarray
+    ) -> np.ndarray:
+        if window_hashes.shape[-2:] != icon_hash.shape:
+            return np.zeros(window_hashes.shape[:2])
+        
+        hamming_distances = np.not_equal(window_hashes, icon_hash).sum(axis=(-2, -1), dtype=np.int32)
+        return 1 - (hamming_distances / icon_hash.size)
+    
+    def calculate_packed_window_hashes(
+        self,
+        image: np.ndarray,
+        window_size: Tuple[int, int],
+        hash_size: int = 16
+    ) -> np.ndarray:
+        gray = self.to_gray(image)
+        
+        win_h, win_w = window_size
+        rows = gray.shape[0] - win_h + 1
+        cols = gray.shape[1] - win_w + 1
+        words = -(-hash_size * hash_size // 64)
+        
+        if rows <= 0 or cols <= 0:
+            return np.zeros((0, 0, words), dtype=np.uint64)
+        
+        if hash_size % 8 or not self._check_window_kernel(win_h, win_w, hash_size):
+            return self.pack_window_hashes(self.calculate_window_hashes(gray, window_size, hash_size))
+        
+        row_bytes = hash_size // 8
+        packed = np.zeros((rows, cols, words * 8), dtype=np.uint8)
+        
+        for y, i, resized in self._resize_windows(gray, win_h, win_w, hash_size):
+            n = len(resized)
+            bits = np.greater(resized[:, 1:], resized[:, :-1]).view(np.uint8)
+            row = np.add.reduce(
+                bits.reshape(n, row_bytes, 8, cols) * self.BIT_WEIGHTS[:, None],
+                axis=2,
+                dtype=np.uint8
+            )
+            packed[y:y+n, :, i*row_bytes:(i+1)*row_bytes] = row.transpose(0, 2, 1)
+        
+        return packed.view(np.uint64)
+    
+    def pack_window_hashes(self, window_hashes: np.ndarray) -> np.ndarray:
+        rows, cols = window_hashes.shape[:2]
+        packed = np.packbits(window_hashes.reshape(rows, cols, -1), axis=-1)
+        
+        padding = (-packed.shape[-1]) % 8
+        if padding:
+            packed = np.concatenate([packed, np.zeros((rows, cols, padding), dtype=np.uint8)], axis=-1)
+        
+        return np.ascontiguousarray(packed).view(np.uint64)
+    
+    def calculate_batch_similarities(
+        self,
+        packed_windows: np.ndarray,
+        hash_matrix: np.ndarray,
+        hash_bits: int
+    ) -> np.ndarray:
+        if hash_matrix.shape[-1] == 1:
+            # 64 位哈希只有一个字, 不需要再按字求和
+            distances = np.bitwise_count(packed_windows[None, :, :, 0] ^ hash_matrix[:, None, None, 0])
+        else:
+            distances = np.bitwise_count(
+                packed_windows[None, :, :, :] ^ hash_matrix[:, None, None, :]
+            ).sum(axis=-1, dtype=np.int32)
+        return 1 - (distances / hash_bits)
+    
+    def _calculate_window_hashes_loop(
+        self,
+        gray: np.ndarray,
+        window_size: Tuple[int, int],
+        hash_size: int
+    ) -> np.ndarray:
+        win_h, win_w = window_size
+        rows = gray.shape[0] - win_h + 1
+        cols = gray.shape[1] - win_w + 1
         
+        hashes = np.empty((rows, cols, hash_size, hash_size), dtype=bool)
+        for y in range(rows):
+            for x in range(cols):
+                window = gray[y:y+win_h, x:x+win_w]
+                hashes[y, x], _ = self.calculate_perceptual_hash(window, hash_size)
+        
+        return hashes
+    
+    def _resize_windows(self, gray: np.ndarray, win_h: int, win_w: int, hash_size: int):
+        # 按 cv2.resize(INTER_LINEAR, CV_8U) 的定点算法对所有窗口同时插值,
+        # 分块产出 (起始窗口行, 输出行, (窗口行, hash_size + 1, 窗口列)), 缓冲区会被复用
+        x0, x1, alpha0, alpha1 = self._linear_resize_taps(win_w, hash_size + 1, clamp=True)
+        y0, y1, beta0, beta1 = self._linear_resize_taps(win_h, hash_size, clamp=False)
+        
+        rows = gray.shape[0] - win_h + 1
+        cols = gray.shape[1] - win_w + 1
+        src = gray.astype(np.int32)
+        
+        col_index = np.arange(cols)
+        horizontal = (
+            src[:, x0[:, None] + col_index] * alpha0[:, None] +
+            src[:, x1[:, None] + col_index] * alpha1[:, None]
+        ) >> 4
+        
+        chunk = min(rows, self.WINDOW_CHUNK_ROWS)
+        top = np.empty((chunk, hash_size + 1, cols), dtype=np.int32)
+        bottom = np.empty_like(top)
+        
+        for y in range(0, rows, chunk):
+            n = min(chunk, rows - y)
+            t, b = top[:n], bottom[:n]
+            
+            for i in range(hash_size):
+                np.multiply(horizontal[y0[i] + y:y0[i] + y + n], beta0[i], out=t)
+                np.multiply(horizontal[y1[i] + y:y1[i] + y + n], beta1[i], out=b)
+                t >>= 16
+                b >>= 16
+                t += b
+                t += 2
+                t >>= 2
+                yield y, i, t
+    
+    def _linear_resize_taps(self, src_size: int, dst_size: int, clamp: bool):
+        key = (src_size, dst_size, clamp)
+        if key in self._resize_taps:
+            return self._resize_taps[key]
+        
+        coef_scale = np.float32(1 << self.RESIZE_COEF_BITS)
+        scale = 1.0 / (dst_size / src_size)
+        
+        index0 = np.empty(dst_size, dtype=np.intp)
+        index1 = np.empty(dst_size, dtype=np.intp)
+        coef0 = np.empty(dst_size, dtype=np.int32)
+        coef1 = np.empty(dst_size, dtype=np.int32)
+        
+        for d in range(dst_size):
+            f = np.float32((d + 0.5) * scale - 0.5)
+            s = int(np.floor(f))
+            f = np.float32(f - np.float32(s))
+            
+            if clamp:
+                if s < 0:
+                    f, s = np.float32(0), 0
+                if s >= src_size - 1:
+                    f, s = np.float32(0), src_size - 1
+            
+            index0[d] = min(max(s, 0), src_size - 1)
+            index1[d] = min(max(s + 1, 0), src_size - 1)
+            coef0[d] = np.rint((np.float32(1) - f) * coef_scale)
+            coef1[d] = np.rint(f * coef_scale)
+        
+        self._resize_taps[key] = (index0, index1, coef0, coef1)
+        return self._resize_taps[key]
+    
+    def _check_window_kernel(self, win_h: int, win_w: int, hash_size: int) -> bool:
+        key = (win_h, win_w, hash_size)
+        if key in self._window_kernel_exact:
+            return self._window_kernel_exact[key]
+        
+        rng = np.random.default_rng(0)
+        probe = rng.integers(0, 256, size=(win_h + 1, win_w + 1), dtype=np.uint8)
+        
+        resized = np.empty((2, hash_size, hash_size + 1, 2), dtype=np.int32)
+        for y, i, values in self._resize_windows(probe, win_h, win_w, hash_size):
+            resized[y:y+len(values), i] = values
+        
+        exact = all(
+            np.array_equal(
+                resized[y, :, :, x],
+                cv2.resize(probe[y:y+win_h, x:x+win_w], (hash_size + 1, hash_size))
+            )
+            for y in range(2)
+            for x in range(2)
+        )
+        
+        if not exact:
+            logger.warning(f"向量化哈希与cv2.resize结果不一致, 回退逐窗口计算: {key}")
+        
+        self._window_kernel_exact[key] = exact
+        return exact
+    
+    def pack_hash(self, hash_bits: np.ndarray) -> np.ndarray:
+        packed = np.packbits(hash_bits.reshape(-1))
+        padding = (-len(packed)) % 8
+        if padding:
+            packed = np.concatenate([packed, np.zeros(padding, dtype=np.uint8)])
+        return packed.view(np.uint64)
+    
+    def calculate_mean_saturation(self, image: np.ndarray) -> Optional[float]:
+        if image is None or image.size == 0 or len(image.shape) != 3:
+            return None
+        
+        hsv = cv2.cvtColor(self.to_bgr(image), cv2.COLOR_BGR2HSV)
+        return np.mean(hsv[:, :, 1]) / 255.0
+    
+    def calculate_color_signature(self, image: np.ndarray) -> Optional[ColorSignature]:
+        if image is None or image.size == 0:
+            return None
+        
+        bgr = self.to_bgr(image)
+        hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, (0, 48, 48), (180, 255, 255))
+        hue_hist = cv2.calcHist([hsv], [0], mask, [self.HUE_BINS], [0, 180]).ravel()
+        
+        return ColorSignature(
+            mean=np.array(cv2.mean(bgr)[:3]),
+            hue_hist=hue_hist / (bgr.shape[0] * bgr.shape[1])
+        )
+    
+    def is_skill_castable(self, icon_image: np.ndarray) -> bool:
         try:
-            if len(icon_image.shape) == 3:
-                hsv = cv2.cvtColor(icon_image, cv2.COLOR_BGR2HSV)
-                saturation = hsv[:, :, 1]
-            else:
-                return True
+            mean_saturation = self.calculate_mean_saturation(icon_image)
             
-            mean_saturation = np.mean(saturation) / 255.0
+            if mean_saturation is None:
+                return True
             
             if mean_saturation < 0.08:
                 return False
             
             return True
-                
+        
         except Exception as e:
             logger.error(f"判断技能状态时出错: {e}")
             return True
     
     def clear_cache(self):
         self._template_cache.clear()
+        self._template_pyramids.clear()
+        self._scaled_templates.clear()
+        self._winning_scales.clear()
         logger.debug("模板缓存已清除")
     
+    @staticmethod
+    def to_gray(image: np.ndarray) -> np.ndarray:
+        if len(image.shape) == 2:
+            return image
+        if image.shape[2] == 4:
+            return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    
+    @staticmethod
+    def to_bgr(image: np.ndarray) -> np.ndarray:
+        # 截图后端输出 BGRA, 模板与保存的图像统一为 BGR
+        if len(image.shape) == 2:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        if image.shape[2] == 4:
+            return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        return image
+    
     @staticmethod
     def screenshot_to_cv2(screenshot) -> np.ndarray:
         return cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
@@ -0,0 +1,240 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, List, Tuple
+import threading
+import time
+import numpy as np
+
+from core.processor import SkillProcessor, IconBinding, TickResult
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+class RingQueue:
+    def __init__(self, maxsize: int = 1):
+        self.maxsize = maxsize
+        self._items: deque = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.put_count = 0
+        self.dropped_count = 0
+    
+    def put(self, item: Any) -> Optional[Any]:
+        # 队列满时丢弃最旧的一项并返回给调用方, 下游总是拿到最新的帧
+        dropped = None
+        with self._cond:
+            if len(self._items) == self.maxsize:
+                dropped = self._items.popleft()
+                self.dropped_count += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify()
+        return dropped
+    
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        with self._cond:
+            while not self._items and not self._closed:
+                if not self._cond.wait(timeout):
+                    return None
+            return self._items.popleft() if self._items else None
+    
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+    
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+@dataclass
+class CapturedFrame:
+    frame_id: int
+    timestamp: float
+    region: Tuple[int, int, int, int]
+    bindings: List[IconBinding]
+    image: np.ndarray
+
+
+class SkillPipeline:
+    def __init__(
+        self,
+        processor: SkillProcessor,
+        queue_size: int = 1,
+        detect_new_skill: Optional[Callable[[], bool]] = None,
+        on_new_skill: Optional[Callable[[np.ndarray], None]] = None,
+        history: int = 256
+    ):
+        self.processor = processor
+        self.queue_size = queue_size
+        self.detect_new_skill = detect_new_skill or (lambda: False)
+        self.on_new_skill = on_new_skill
+        
+        self.match_queue = RingQueue(queue_size)
+        self.act_queue = RingQueue(queue_size)
+        
+        # 截图缓冲区每帧都会被覆盖, 进入队列的帧复制到空闲缓冲区中, 匹配完成或被丢弃后归还:
+        # 队列中最多 queue_size 帧, 匹配阶段持有 1 帧, 截图阶段正在写 1 帧
+        self._pool_size = queue_size + 2
+        self._free: deque = deque()
+        self._pool_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._idle = False
+        self._frame_id = 0
+        
+        self._latencies: deque = deque(maxlen=history)
+        self._acted_times: deque = deque(maxlen=history)
+        self.captured_count = 0
+        self.matched_count = 0
+        self.acted_count = 0
+        self.cast_count = 0
+    
+    def start(self):
+        if self.is_running:
+            return
+        
+        self.match_queue = RingQueue(self.queue_size)
+        self.act_queue = RingQueue(self.queue_size)
+        
+        scheduler = self.processor.scheduler
+        scheduler.configure(self.processor.settings)
+        scheduler.start()
+        
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="PipelineCapture", daemon=True),
+            threading.Thread(target=self._match_loop, name="PipelineMatch", daemon=True),
+            threading.Thread(target=self._act_loop, name="PipelineAct", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        
+        logger.info("流水线已启动")
+    
+    def stop(self, timeout: float = 1.0):
+        self.processor.scheduler.stop()
+        self.match_queue.close()
+        self.act_queue.close()
+        
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+    
+    @property
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+    
+    def _capture_loop(self):
+        scheduler = self.processor.scheduler
+        
+        try:
+            while scheduler.wait():
+                scheduler.configure(self.processor.settings)
+                
+                if not self.processor.enabled:
+                    break
+                
+                region, bindings = self.processor.snapshot()
+                if not region:
+                    scheduler.advance(idle=True)
+                    continue
+                
+                try:
+                    timestamp = time.perf_counter()
+                    image = self._store(self.processor.capture.grab(region))
+                    self._frame_id += 1
+                    self.captured_count += 1
+                    
+                    dropped = self.match_queue.put(CapturedFrame(self._frame_id, timestamp, region, bindings, image))
+                    if dropped is not None:
+                        self._release(dropped.image)
+                except Exception as e:
+                    logger.error(f"流水线截图出错: {e}")
+                
+                scheduler.advance(idle=self._idle)
+        finally:
+            self.match_queue.close()
+    
+    def _store(self, frame: np.ndarray) -> np.ndarray:
+        with self._pool_lock:
+            buffer = self._free.popleft() if self._free else None
+        
+        if buffer is None or buffer.shape != frame.shape:
+            buffer = np.empty_like(frame)
+        
+        np.copyto(buffer, frame)
+        return buffer
+    
+    def _release(self, buffer: np.ndarray):
+        with self._pool_lock:
+            if len(self._free) < self._pool_size:
+                self._free.append(buffer)
+    
+    def _match_loop(self):
+        try:
+            while True:
+                frame = self.match_queue.get()
+                if frame is None:
+                    break
+                
+                try:
+                    result = self.processor.evaluate(
+                        frame.region, frame.image, frame.bindings, self.detect_new_skill()
+                    )
+                    result.frame_id = frame.frame_id
+                    result.timestamp = frame.timestamp
+                    self.matched_count += 1
+                    self.act_queue.put(result)
+                except Exception as e:
+                    logger.error(f"流水线匹配出错 [帧 {frame.frame_id}]: {e}")
+                finally:
+                    self._release(frame.image)
+        finally:
+            self.act_queue.close()
+    
+    def _act_loop(self):
+        while True:
+            result: Optional[TickResult] = self.act_queue.get()
+            if result is None:
+                break
+            
+            try:
+                if self.processor.act(result) is not None:
+                    self.cast_count += 1
+                
+                if result.new_skill is not None and self.on_new_skill:
+                    self.on_new_skill(result.new_skill)
+                
+                now = time.perf_counter()
+                self._latencies.append(now - result.timestamp)
+                self._acted_times.append(now)
+                self.acted_count += 1
+                self._idle = result.idle
+            except Exception as e:
+                logger.error(f"流水线执行出错 [帧 {result.frame_id}]: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            'captured': self.captured_count,
+            'matched': self.matched_count,
+            'acted': self.acted_count,
+            'casts': self.cast_count,
+            'match_dropped': self.match_queue.dropped_count,
+            'act_dropped': self.act_queue.dropped_count,
+            'throughput_hz': 0.0,
+            'latency_avg_ms': 0.0,
+            'latency_p95_ms': 0.0,
+        }
+        
+        if len(self._acted_times) > 1:
+            elapsed = self._acted_times[-1] - self._acted_times[0]
+            if elapsed > 0:
+                stats['throughput_hz'] = (len(self._acted_times) - 1) / elapsed
+        
+        if self._latencies:
+            latencies = np.array(self._latencies) * 1000
+            stats['latency_avg_ms'] = float(latencies.mean())
+            stats['latency_p95_ms'] = float(np.percentile(latencies, 95))
+        
+        return stats
@@ -1,15 +1,24 @@
-from dataclasses import dataclass, field
-from typing import Optional, Dict, Callable, Tuple
+from dataclasses import dataclass, field, replace
+from typing import Optional, Dict, Callable, Tuple, List, Hashable, Set, FrozenSet
+from itertools import compress
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import threading
 import time
 import numpy as np
-import cv2
-import pyautogui
-import keyboard
 
-from core.config import ConfigManager, SpecConfig, IconBindingData, AppSettings
+from core.config import ConfigManager, SpecConfig, IconBindingData, AppSettings, MonitorRegion
 from core.matcher import ImageMatcher, MatchResult
+from core.bank import TemplateBank, CompiledTemplate
+from core.capture import CaptureBackend, create_capture_backend, union_region, crop_region
+from core.gate import FrameGate
+from core.scheduler import ScanScheduler
+from core.dispatcher import InputDispatcher, KeyChord
+from core.tracker import LocationTracker
+from core.cascade import CascadeStats
+from core.rotation import TransitionTable
+from core.specs import SpecCache
+from core.template_cache import TemplateSource, pack_templates, unpack_templates, read_template_source
 from utils.logger import get_logger
 
 logger = get_logger()
@@ -28,6 +37,12 @@ class IconBinding:
     total_similarity: float = 0.0
     max_similarity: float = 0.0
     min_similarity: float = 1.0
+    last_location: Optional[Tuple[int, int]] = None
+    hit_score: float = 0.0
+    skip_count: int = 0
+    rank: int = 0
+    dirty: bool = True
+    _chord: Optional[KeyChord] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if not self.text:
@@ -44,6 +59,10 @@ class IconBinding:
         self.max_similarity = max(self.max_similarity, similarity)
         self.min_similarity = min(self.min_similarity, similarity)
     
+    def record_hit(self, hit: bool, decay: float):
+        # 指数衰减的命中频率, 最近常出现的技能排在前面
+        self.hit_score = self.hit_score * decay + (1.0 if hit else 0.0)
+    
     def get_avg_similarity(self) -> float:
         return self.total_similarity / self.match_count if self.match_count > 0 else 0.0
     
@@ -54,18 +73,93 @@ class IconBinding:
     
     def can_cast(self) -> bool:
         return time.time() - self.last_cast >= self.cooldown
+    
+    @property
+    def chord(self) -> KeyChord:
+        # 热键可能在界面上被修改, 变化时才重新解析
+        if self._chord is None or self._chord.hotkey != self.hotkey:
+            self._chord = KeyChord.parse(self.hotkey)
+        return self._chord
+
+
+@dataclass
+class TickResult:
+    frame: Optional[np.ndarray] = None
+    scores: Dict[str, float] = field(default_factory=dict)
+    binding: Optional[IconBinding] = None
+    match: MatchResult = field(default_factory=lambda: MatchResult(found=False, confidence=0.0))
+    cast: Optional[str] = None
+    new_skill: Optional[np.ndarray] = None
+    changed: bool = True
+    margin: float = 0.0
+    margin_partial: bool = False
+    # 预测提前结束时没有匹配的候选技能
+    unevaluated: FrozenSet[str] = frozenset()
+    frame_id: int = 0
+    timestamp: float = 0.0
+    regions: Dict[str, 'TickResult'] = field(default_factory=dict)
+    
+    @property
+    def idle(self) -> bool:
+        # 没有释放技能, 且画面未变化或区域内没有可识别的技能
+        return self.cast is None and (not self.changed or self.binding is None)
+
+
+@dataclass
+class LoadedSpec:
+    # 一个配置加载后的全部状态, 切换配置时整体替换; 常驻期间对绑定的修改都保留在这里
+    name: str
+    config: SpecConfig
+    bindings: Dict[str, IconBinding]
+    bank: TemplateBank
+    rotation: TransitionTable
+    mtime_ns: int
+    
+    @property
+    def nbytes(self) -> int:
+        return self.bank.nbytes
 
 
 class SkillProcessor:
+    HIT_DECAY = 0.9
+    PARALLEL_MIN_PIXELS = 96 * 96
+    REGION_WORKERS = 3
+    LOAD_WORKERS = 4
+    SPEC_MEMORY_LIMIT = 32 * 1024 * 1024
+    
     def __init__(self, config_manager: Optional[ConfigManager] = None):
         self.config_manager = config_manager or ConfigManager()
         self.matcher = ImageMatcher()
+        self.bank = TemplateBank(self.matcher)
+        self._capture: Optional[CaptureBackend] = None
+        self.gate = FrameGate()
+        self.scheduler = ScanScheduler()
+        self.dispatcher = InputDispatcher()
+        self.tracker = LocationTracker(self.matcher)
+        self.fixed_slot_count = 0
+        self.cascade = CascadeStats()
+        self.rotation = TransitionTable()
+        self._last_cast_name: Optional[str] = None
+        self._rotation_spec: Optional[str] = None
+        self.evaluated_tick_count = 0
+        self.evaluated_binding_count = 0
+        self._last_tick: Optional[TickResult] = None
+        # 得出 _last_tick 时参与匹配 (未在冷却) 的技能
+        self._last_candidates: FrozenSet[str] = frozenset()
         
         self.icon_bindings: Dict[str, IconBinding] = {}
         self.monitor_region: Optional[Tuple[int, int, int, int]] = None
+        self.regions: Dict[str, MonitorRegion] = {}
+        self._region_gates: Dict[str, FrameGate] = {}
+        self._region_ticks: Dict[str, TickResult] = {}
+        self._region_pool: Optional[ThreadPoolExecutor] = None
+        self.specs = SpecCache(self._build_spec, self.SPEC_MEMORY_LIMIT)
+        self._spec: Optional[LoadedSpec] = None
         self.enabled = False
         
         self._lock = threading.RLock()
+        # 匹配期间持有, 切换配置要等当前这一帧匹配完, 整帧使用同一套绑定和模板库; 先于 _lock 获取
+        self._spec_lock = threading.Lock()
         self._status_callback: Optional[Callable[[str], None]] = None
         self._last_match_value = 0.0
     
@@ -83,41 +177,185 @@ class SkillProcessor:
             return self.config_manager.current_config.settings
         return AppSettings()
     
+    @property
+    def capture(self) -> CaptureBackend:
+        if self._capture is None:
+            self._capture = create_capture_backend(self.settings.capture_backend)
+            logger.info(f"截图后端: {self._capture.name}")
+        return self._capture
+    
+    def set_capture_backend(self, backend: Optional[CaptureBackend]):
+        with self._lock:
+            if self._capture is not None and self._capture is not backend:
+                self._capture.close()
+            self._capture = backend
+    
     def load_config(self, spec_name: str) -> bool:
+        # 已预加载的配置直接替换, 不停止监控; JSON 被外部修改过时重新加载
+        loaded = self.specs.peek(spec_name)
+        if loaded is not None and self.config_manager.is_modified_externally(spec_name, loaded.mtime_ns):
+            self.specs.discard(spec_name)
+        
+        loaded = self.specs.get(spec_name)
+        if loaded is None:
+            logger.error(f"加载配置失败: {spec_name}")
+            return False
+        
+        self._activate(loaded)
+        return True
+    
+    def preload_specs(self):
+        self.specs.preload(self.config_manager.get_available_specs())
+    
+    def forget_spec(self, spec_name: str):
+        # 配置被删除后不再写回它的转移表
         with self._lock:
-            config = self.config_manager.load_spec(spec_name)
+            self.specs.discard(spec_name)
+            if self._rotation_spec == spec_name:
+                self._rotation_spec = None
+    
+    def _activate(self, loaded: LoadedSpec):
+        with self._spec_lock, self._lock:
+            previous = self._spec
+            if previous is not None:
+                # 监控区域由界面直接修改处理器属性, 切走前写回常驻的配置
+                previous.config.monitor_region = self.monitor_region
+                previous.config.regions = self.regions
             
-            if config is None:
-                logger.error(f"加载配置失败: {spec_name}")
-                return False
+            self.save_rotation()
+            self._spec = loaded
+            self.specs.active = loaded.name
+            self.config_manager.set_current(loaded.config)
+            
+            self.icon_bindings = loaded.bindings
+            self.bank = loaded.bank
+            self.matcher.scales = tuple(loaded.config.settings.template_scales)
+            self.rotation = loaded.rotation
+            self._rotation_spec = loaded.name
+            self._last_cast_name = None
             
-            self.monitor_region = config.monitor_region
+            self.monitor_region = loaded.config.monitor_region
+            self.regions = dict(loaded.config.regions)
+            self.gate.reset()
+            self._region_gates.clear()
+            self._region_ticks.clear()
+            self._last_tick = None
+            self._last_candidates = frozenset()
+        
+        logger.info(f"切换到配置: {loaded.name} ({len(loaded.bindings)} 个技能绑定)")
+    
+    def _build_spec(self, spec_name: str) -> Optional[LoadedSpec]:
+        # 可能在预加载线程中运行, 只读取文件和构建新对象, 不修改处理器的状态
+        mtime_ns = self.config_manager.get_spec_mtime(spec_name)
+        config = self.config_manager.read_spec(spec_name)
+        if config is None:
+            return None
+        
+        bank = TemplateBank(self.matcher, hash_size=config.settings.hash_size)
+        entries = self._load_templates(spec_name, config, bank)
+        bindings: Dict[str, IconBinding] = {}
+        
+        for name, binding_data in config.icon_bindings.items():
+            entry = entries.get(name)
             
-            self.icon_bindings.clear()
-            success_count = 0
+            if entry is not None:
+                binding = IconBinding(
+                    name=name,
+                    hotkey=binding_data.hotkey,
+                    template=entry.template,
+                    text=binding_data.text,
+                    threshold=config.settings.threshold,
+                    dirty=False
+                )
+                bindings[name] = binding
+                bank.add_compiled(entry)
+                logger.debug(f"加载技能绑定: {binding.text} -> {binding.hotkey}")
+            else:
+                logger.warning(f"无法加载模板: {self.config_manager.get_template_path(spec_name, name)}")
+        
+        rotation = TransitionTable()
+        rotation.load_dict(self.config_manager.load_rotation(spec_name))
+        
+        logger.info(f"成功加载 {spec_name}: {len(bindings)}/{len(config.icon_bindings)} 个技能绑定")
+        return LoadedSpec(spec_name, config, bindings, bank, rotation, mtime_ns)
+    
+    def _load_templates(
+        self,
+        spec_name: str,
+        config: SpecConfig,
+        bank: TemplateBank
+    ) -> Dict[str, CompiledTemplate]:
+        # 优先使用编译缓存, 只有修改过的 PNG 才重新解码; 缓存缺失时在线程池中并行解码
+        arrays = self.config_manager.load_template_cache(spec_name)
+        cached = unpack_templates(arrays, bank)
+        
+        entries: Dict[str, CompiledTemplate] = {}
+        sources: Dict[str, TemplateSource] = {}
+        pending = []
+        
+        for name in config.icon_bindings:
+            path = self.config_manager.get_template_path(spec_name, name)
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
             
-            for name, binding_data in config.icon_bindings.items():
-                template_path = self.config_manager.get_template_path(spec_name, name)
-                template = self.matcher.load_template(template_path)
-                
-                if template is not None:
-                    binding = IconBinding(
-                        name=name,
-                        hotkey=binding_data.hotkey,
-                        template=template,
-                        text=binding_data.text,
-                        threshold=config.settings.threshold
-                    )
-                    self.icon_bindings[name] = binding
-                    success_count += 1
-                    logger.debug(f"加载技能绑定: {binding.text} -> {binding.hotkey}")
-                else:
-                    logger.warning(f"无法加载模板: {template_path}")
+            hit = cached.get(name)
+            if hit is not None and hit[0].matches(stat):
+                sources[name], entries[name] = hit
+            else:
+                pending.append((name, path, hit))
+        
+        if pending:
+            workers = min(self.LOAD_WORKERS, len(pending))
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="TemplateLoader") as pool:
+                    results = list(pool.map(lambda item: self._compile_template(item, bank), pending))
+            else:
+                results = [self._compile_template(item, bank) for item in pending]
             
-            logger.info(f"成功加载 {success_count}/{len(config.icon_bindings)} 个技能绑定")
-            return True
+            for (name, _, _), result in zip(pending, results):
+                if result is not None:
+                    sources[name], entries[name] = result
+        
+        stale = (
+            bool(pending)
+            or set(cached) != set(entries)
+            or (bool(arrays) and int(arrays['hash_size']) != bank.hash_size)
+        )
+        if stale:
+            names = [name for name in config.icon_bindings if name in entries]
+            self.config_manager.save_template_cache(
+                spec_name,
+                pack_templates([entries[name] for name in names], [sources[name] for name in names], bank.hash_size)
+            )
+            logger.debug(f"模板缓存已更新: {spec_name} (重新解码 {len(pending)} 个)")
+        
+        return entries
+    
+    def _compile_template(
+        self,
+        item: Tuple[str, Path, Optional[Tuple[TemplateSource, CompiledTemplate]]],
+        bank: TemplateBank
+    ) -> Optional[Tuple[TemplateSource, CompiledTemplate]]:
+        name, path, hit = item
+        loaded = read_template_source(path)
+        if loaded is None:
+            return None
+        
+        source, data = loaded
+        # 只有修改时间变了而内容没变时继续使用缓存的特征
+        if hit is not None and hit[0].digest == source.digest:
+            return source, hit[1]
+        
+        template = self.matcher.decode_template(data)
+        if template is None:
+            logger.error(f"无法解码模板图像: {path}")
+            return None
+        return source, bank.compile(name, template)
     
     def save_config(self) -> bool:
+        # 持锁时只生成快照; 只有修改过的模板才重新编码, 编码和写文件都在后台写入线程中完成
         with self._lock:
             spec_name = self.config_manager.current_spec
             if not spec_name:
@@ -128,21 +366,54 @@ class SkillProcessor:
                 spec_name=spec_name,
                 monitor_region=self.monitor_region,
                 settings=self.settings,
-                icon_bindings={}
+                icon_bindings={},
+                regions=dict(self.regions)
             )
             
             for name, binding in self.icon_bindings.items():
-                template_path = self.config_manager.get_template_path(spec_name, name)
-                
-                if self.matcher.save_template(template_path, binding.template):
-                    config.icon_bindings[name] = IconBindingData(
-                        name=name,
-                        hotkey=binding.hotkey,
-                        text=binding.text,
-                        threshold=binding.threshold
-                    )
+                config.icon_bindings[name] = IconBindingData(
+                    name=name,
+                    hotkey=binding.hotkey,
+                    text=binding.text,
+                    threshold=binding.threshold
+                )
+                if binding.dirty:
+                    self._save_template(spec_name, binding)
             
-            return self.config_manager.save_spec(config)
+            self.save_rotation()
+            self.config_manager.save_spec(config)
+            
+            if self._spec is not None and self._spec.name == spec_name:
+                self._spec.config = config
+            return True
+    
+    def _save_template(self, spec_name: str, binding: IconBinding):
+        template = binding.template
+        binding.dirty = False
+        
+        def done(success: bool):
+            # 写入失败且期间没有再次修改时, 下次保存重试
+            if not success and binding.template is template:
+                binding.dirty = True
+        
+        self.config_manager.save_template(
+            spec_name, binding.name, lambda: self.matcher.encode_template(template), done
+        )
+    
+    def save_rotation(self) -> bool:
+        # 转移表只在有新记录时写回, 与配置 JSON 放在同一目录
+        if self._rotation_spec is None or not self.rotation.dirty:
+            return True
+        
+        rotation = self.rotation
+        rotation.dirty = False
+        
+        def done(success: bool):
+            if not success:
+                rotation.dirty = True
+        
+        self.config_manager.save_rotation(self._rotation_spec, rotation.to_dict(), done)
+        return True
     
     def add_icon_binding(
         self,
@@ -167,6 +438,7 @@ class SkillProcessor:
             )
             
             self.icon_bindings[name] = binding
+            self.bank.add(name, template)
             logger.info(f"添加技能绑定: {binding.text} -> {hotkey}")
             return binding
     
@@ -174,10 +446,25 @@ class SkillProcessor:
         with self._lock:
             if name in self.icon_bindings:
                 binding = self.icon_bindings.pop(name)
+                self.bank.remove(name)
+                self.rotation.remove(name)
                 logger.info(f"删除技能绑定: {binding.text}")
                 return True
             return False
     
+    def update_icon_template(self, name: str, template: np.ndarray) -> bool:
+        with self._lock:
+            if name not in self.icon_bindings:
+                return False
+            
+            binding = self.icon_bindings[name]
+            binding.template = template
+            binding.dirty = True
+            binding.last_location = None
+            self.bank.add(name, template)
+            logger.info(f"更新技能模板: {binding.text}")
+            return True
+    
     def set_monitor_region(self, x1: int, y1: int, x2: int, y2: int):
         with self._lock:
             self.monitor_region = (x1, y1, x2 - x1, y2 - y1)
@@ -190,134 +477,648 @@ class SkillProcessor:
         if not binding.can_cast():
             return False
         
-        try:
-            hotkey = binding.hotkey
-            
-            if hotkey.startswith('alt+'):
-                key = hotkey[4:]
-                keyboard.press('alt')
-                time.sleep(0.01)
-                keyboard.press(key)
-                time.sleep(self.settings.key_press_delay)
-                keyboard.release(key)
-                keyboard.release('alt')
-            else:
-                keyboard.press(hotkey)
-                time.sleep(self.settings.key_press_delay)
-                keyboard.release(hotkey)
-            
-            binding.last_cast = time.time()
-            binding.update_stats(self._last_match_value)
-            self.update_status(f"释放技能 [{binding.text}] - 按键: {hotkey}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"按键模拟失败 [{binding.text}]: {e}")
+        # 按下、保持、松开都在按键线程中完成, 监控线程不再等待 key_press_delay
+        if not self.dispatcher.submit(binding.chord, self.settings.key_press_delay):
             return False
+        
+        binding.last_cast = time.time()
+        binding.update_stats(self._last_match_value)
+        self._last_cast_name = binding.name
+        self.update_status(f"释放技能 [{binding.text}] - 按键: {binding.hotkey}")
+        return True
     
     def process_frame(self) -> Optional[str]:
+        return self.tick().cast
+    
+    def tick(self, detect_new_skill: bool = False) -> TickResult:
         if not self.monitor_region or not self.enabled:
-            return None
+            return TickResult()
         
         try:
-            with self._lock:
-                region = self.monitor_region
-                bindings = list(self.icon_bindings.values())
+            region, bindings = self.snapshot()
+            timestamp = time.perf_counter()
+            region_cv = self._capture_region(region)
+            
+            result = self.evaluate(region, region_cv, bindings, detect_new_skill)
+            result.timestamp = timestamp
+            self.act(result)
+            return result
+        
+        except Exception as e:
+            logger.error(f"处理帧时出错: {e}")
+            return TickResult()
+    
+    def _capture_region(self, region: Tuple[int, int, int, int]) -> np.ndarray:
+        return self.capture.grab(region)
+    
+    def snapshot(self) -> Tuple[Optional[Tuple[int, int, int, int]], List[IconBinding]]:
+        # 有附加监控区域时返回所有区域的外接矩形, 每帧只截一次图
+        with self._lock:
+            region = self.monitor_region
+            if region and self.regions:
+                region = union_region([region, *(spec_region.rect for spec_region in self.regions.values())])
+            return region, list(self.icon_bindings.values())
+    
+    def act(self, result: TickResult) -> Optional[str]:
+        if result.binding is not None:
+            self._last_match_value = result.match.confidence
+            
+            if self.cast_skill(result.binding):
+                result.cast = result.binding.text
+        
+        return result.cast
+    
+    def evaluate(
+        self,
+        region: Tuple[int, int, int, int],
+        region_cv: np.ndarray,
+        bindings: List[IconBinding],
+        detect_new_skill: bool = False
+    ) -> TickResult:
+        with self._spec_lock:
+            return self._evaluate(region, region_cv, bindings, detect_new_skill)
+    
+    def _evaluate(
+        self,
+        region: Tuple[int, int, int, int],
+        region_cv: np.ndarray,
+        bindings: List[IconBinding],
+        detect_new_skill: bool = False
+    ) -> TickResult:
+        with self._lock:
+            monitor_region = self.monitor_region
+            regions = list(self.regions.values())
+            # 截图后配置已被切换时丢弃旧配置的绑定, 避免把旧模板编译进新的模板库
+            bindings = [binding for binding in bindings if self.icon_bindings.get(binding.name) is binding]
+        
+        if not regions:
+            return self._evaluate_primary(region, region_cv, bindings, detect_new_skill)
+        
+        # 从外接矩形的截图中切出各区域的视图; 主区域不在截图内时整张截图按主区域处理
+        views = []
+        for spec_region in regions:
+            view = crop_region(region_cv, region, spec_region.rect)
+            if view is not None:
+                views.append((spec_region, view))
+        
+        primary_region, primary_cv = region, region_cv
+        primary_view = crop_region(region_cv, region, monitor_region) if monitor_region else None
+        if primary_view is not None:
+            primary_region, primary_cv = monitor_region, primary_view
+        
+        # 较大的附加区域交给线程池与主区域并行匹配, 小区域直接在当前线程匹配
+        futures = []
+        inline = []
+        for spec_region, view in views:
+            if view.shape[0] * view.shape[1] >= self.PARALLEL_MIN_PIXELS:
+                futures.append((spec_region, self._region_executor().submit(
+                    self._evaluate_region, spec_region, view, bindings
+                )))
+            else:
+                inline.append((spec_region, view))
+        
+        result = self._evaluate_primary(primary_region, primary_cv, bindings, detect_new_skill)
+        
+        for spec_region, view in inline:
+            result.regions[spec_region.name] = self._evaluate_region(spec_region, view, bindings)
+        for spec_region, future in futures:
+            result.regions[spec_region.name] = future.result()
+        
+        # 主区域没有可释放的技能时, 取附加释放区域中置信度最高的结果
+        if result.binding is None:
+            for spec_region, _ in views:
+                region_result = result.regions[spec_region.name]
+                if (
+                    spec_region.role == 'cast'
+                    and region_result.binding is not None
+                    and region_result.match.confidence > result.match.confidence
+                ):
+                    result.binding = region_result.binding
+                    result.match = region_result.match
+        
+        return result
+    
+    def _region_executor(self) -> ThreadPoolExecutor:
+        if self._region_pool is None:
+            self._region_pool = ThreadPoolExecutor(
+                max_workers=self.REGION_WORKERS, thread_name_prefix="RegionMatch"
+            )
+        return self._region_pool
+    
+    def _reuse_previous(
+        self,
+        gate: FrameGate,
+        region_cv: np.ndarray,
+        region_gray: np.ndarray,
+        key: Tuple,
+        previous: Optional[TickResult]
+    ) -> Optional[TickResult]:
+        # 画面没有变化时沿用上一次的分类结果, 是否能再次释放仍由 cast_skill 按冷却判断
+        settings = self.settings
+        if not settings.frame_gating:
+            return None
+        
+        gate.tolerance = settings.frame_change_tolerance
+        if previous is None:
+            # 没有可沿用的结果时必须重新匹配, 只计入帧数, 不算作跳过
+            gate.frame_count += 1
+            return None
+        if not gate.is_unchanged(region_gray, key):
+            return None
+        
+        return TickResult(
+            frame=region_cv,
+            scores=previous.scores,
+            binding=previous.binding,
+            match=previous.match,
+            new_skill=previous.new_skill,
+            changed=False,
+            margin=previous.margin,
+            margin_partial=previous.margin_partial,
+            unevaluated=previous.unevaluated
+        )
+    
+    def _evaluate_primary(
+        self,
+        region: Tuple[int, int, int, int],
+        region_cv: np.ndarray,
+        bindings: List[IconBinding],
+        detect_new_skill: bool = False
+    ) -> TickResult:
+        settings = self.settings
+        region_gray = self.matcher.to_gray(region_cv)
+        candidates = self._select_candidates(bindings)
+        
+        # 键只描述画面来源和模板, 冷却在命中后对缓存的得分过滤; 释放技能后画面不变时仍能沿用
+        key = (
+            region,
+            self.bank.version,
+            tuple(binding.name for binding in bindings),
+            detect_new_skill,
+            settings.new_skill_threshold
+        )
+        
+        previous = self._castable_previous(self._last_tick, candidates)
+        reused = self._reuse_previous(self.gate, region_cv, region_gray, key, previous)
+        if reused is not None:
+            return reused
+        
+        result = self._evaluate_frame(region_cv, bindings, detect_new_skill, region_gray, candidates)
+        self.gate.update(region_gray, key)
+        self._last_tick = result
+        self._last_candidates = frozenset(candidate.name for candidate in candidates)
+        return result
+    
+    def _castable_previous(
+        self,
+        previous: Optional[TickResult],
+        candidates: List[IconBinding]
+    ) -> Optional[TickResult]:
+        # 按当前的冷却过滤上一次的结果; 需要重新匹配时返回 None: 上次因冷却跳过的技能现在可以释放 (缓存中没有它的得分),
+        # 或上次的技能在冷却, 而其余技能的得分已过阈值或因预测提前结束没有匹配
+        if previous is None:
+            return None
+        
+        names = {candidate.name for candidate in candidates}
+        if not names <= self._last_candidates:
+            return None
+        
+        if previous.binding is None or previous.binding.name in names:
+            return previous
+        
+        if not previous.unevaluated.isdisjoint(names):
+            return None
+        
+        for candidate in candidates:
+            # 没有得分的是被颜色预筛选排除的技能, 重新匹配也会被排除
+            score = previous.scores.get(candidate.name)
+            if score is not None and score >= candidate.threshold:
+                return None
+        
+        # 刚释放的技能进入冷却, 其余技能都未过阈值: 本帧沿用得分, 但没有可释放的技能
+        return replace(previous, binding=None, match=MatchResult(found=False, confidence=0.0))
+    
+    def _evaluate_region(
+        self,
+        spec_region: MonitorRegion,
+        region_cv: np.ndarray,
+        bindings: List[IconBinding]
+    ) -> TickResult:
+        # 附加区域只做无状态的匹配: 不做位置跟踪、转移预测和新技能判断, 避免与主区域互相干扰
+        settings = self.settings
+        members = [binding for binding in bindings if spec_region.accepts(binding.name)]
+        if spec_region.role == 'cast':
+            members = [binding for binding in members if binding.can_cast()]
+        
+        region_gray = self.matcher.to_gray(region_cv)
+        gate = self._region_gates.setdefault(spec_region.name, FrameGate())
+        key = (spec_region.rect, self.bank.version, tuple(binding.name for binding in members))
+        
+        reused = self._reuse_previous(gate, region_cv, region_gray, key, self._region_ticks.get(spec_region.name))
+        if reused is not None:
+            return reused
+        
+        similarities = self._score_region(
+            region_cv, members, region_gray,
+            prefilter=settings.color_prefilter,
+            record_scan=False
+        )
+        binding, match = self._classify_region(region_cv, members, similarities)
+        result = TickResult(frame=region_cv, scores=self._max_scores(similarities), binding=binding, match=match)
+        
+        gate.update(region_gray, key)
+        self._region_ticks[spec_region.name] = result
+        return result
+    
+    def _evaluate_frame(
+        self,
+        region_cv: np.ndarray,
+        bindings: List[IconBinding],
+        detect_new_skill: bool = False,
+        region_gray: Optional[np.ndarray] = None,
+        candidates: Optional[List[IconBinding]] = None
+    ) -> TickResult:
+        settings = self.settings
+        if candidates is None:
+            candidates = self._select_candidates(bindings)
+        
+        candidate_ids = {id(candidate) for candidate in candidates}
+        for rank, candidate in enumerate(candidates):
+            candidate.rank = rank
+        for skipped in bindings:
+            if id(skipped) not in candidate_ids:
+                skipped.skip_count += 1
+        
+        track = False
+        if settings.roi_tracking:
+            self.tracker.radius = settings.tracking_radius
+            self.tracker.revalidate_ticks = settings.tracking_revalidate_ticks
+            track = self.tracker.begin_tick()
+        
+        # 按上一次释放的技能预测下一个技能: 先只匹配最可能的几个, 得分超过阈值 prediction_margin 以上才提前结束,
+        # 否则再匹配其余技能, 在全部结果中取最高分
+        previous = self._last_cast_name
+        phases = [candidates]
+        if settings.rotation_prediction:
+            predicted = self.rotation.predict(previous, [candidate.name for candidate in candidates])
+            if predicted and len(predicted) < len(candidates):
+                by_name = {candidate.name: candidate for candidate in candidates}
+                phases = [
+                    [by_name[name] for name in predicted],
+                    [candidate for candidate in candidates if candidate.name not in predicted]
+                ]
+        
+        # 同一帧、同一组相似度同时用于释放判断和新技能判断
+        similarities: Dict[str, np.ndarray] = {}
+        window_hashes: Dict[Hashable, np.ndarray] = {}
+        deferred: List[IconBinding] = []
+        # 推迟到最后一轮的技能会出现在两轮中, 每个技能每帧只计一次
+        evaluated: Set[int] = set()
+        binding = None
+        match = MatchResult(found=False, confidence=0.0)
+        for index, phase in enumerate(phases):
+            last = index == len(phases) - 1
+            if last:
+                phase = phase + deferred
+            
+            phase_similarities = self._score_region(
+                region_cv, phase, region_gray,
+                track=track,
+                prefilter=settings.color_prefilter,
+                window_hashes=window_hashes,
+                deferred=None if last else deferred
+            )
+            similarities.update(phase_similarities)
+            evaluated.update(id(candidate) for candidate in phase)
+            
+            phase_binding, phase_match = self._classify_region(region_cv, phase, phase_similarities)
+            if phase_binding is not None and phase_match.confidence > match.confidence:
+                binding, match = phase_binding, phase_match
+            if binding is not None and match.confidence >= binding.threshold + settings.prediction_margin:
+                break
+        
+        self.evaluated_binding_count += len(evaluated)
+        self.evaluated_tick_count += 1
+        if len(phases) > 1:
+            self.rotation.record_prediction(binding is not None and binding.name in predicted)
+        
+        if binding is not None:
+            self.rotation.record(previous, binding.name)
+            if match.location is not None:
+                binding.last_location = match.location
+        
+        for other in bindings:
+            other.record_hit(other is binding, self.HIT_DECAY)
+        
+        result = TickResult(
+            frame=region_cv,
+            scores=self._max_scores(similarities),
+            binding=binding,
+            match=match,
+            unevaluated=frozenset(candidate.name for candidate in candidates if id(candidate) not in evaluated)
+        )
+        
+        if detect_new_skill:
+            new_skill_threshold = settings.new_skill_threshold
+            if (
+                not any(score >= new_skill_threshold for score in result.scores.values())
+                and len(result.scores) < len(bindings)
+            ):
+                # 冷却中跳过或被颜色预筛选排除的技能没有分数, 判定新技能前补上完整的哈希比较,
+                # 避免把已知技能当成新技能添加
+                result.scores = self._max_scores(self._score_region(region_cv, bindings, region_gray))
+            
+            if not any(score >= new_skill_threshold for score in result.scores.values()):
+                # 截图缓冲区会被下一帧覆盖, 新技能图像需要独立保存
+                result.new_skill = self.matcher.to_bgr(region_cv).copy()
+        
+        # 最佳与次佳技能的分差, 越小说明两个图标越难区分; 被预筛选、冷却或预测提前结束跳过的技能没有分数,
+        # 这时的分差只是上限, 不能作为置信度依据
+        ranked = sorted(result.scores.values(), reverse=True)
+        if ranked:
+            result.margin = ranked[0] - (ranked[1] if len(ranked) > 1 else 0.0)
+        result.margin_partial = len(result.scores) < len(bindings)
+        
+        return result
+    
+    def _select_candidates(self, bindings: List[IconBinding]) -> List[IconBinding]:
+        # 冷却中的技能即使匹配到也不会释放, 不参与匹配; 其余按命中频率从高到低排列,
+        # 分类时先定位最可能的技能, 之后的技能只要最高分不超过它就不再定位
+        candidates = [binding for binding in bindings if binding.can_cast()]
+        candidates.sort(key=lambda binding: binding.hit_score, reverse=True)
+        return candidates
+    
+    @staticmethod
+    def _max_scores(similarities: Dict[str, np.ndarray]) -> Dict[str, float]:
+        return {
+            name: max(0.0, values.max()) if values.size else 0.0
+            for name, values in similarities.items()
+        }
+    
+    def _classify_region(
+        self,
+        region_cv: np.ndarray,
+        bindings: List[IconBinding],
+        scores: Optional[Dict[str, np.ndarray]] = None
+    ) -> Tuple[Optional[IconBinding], MatchResult]:
+        if scores is None:
+            scores = self._score_region(region_cv, bindings)
+        
+        best_binding = None
+        best_result = MatchResult(found=False, confidence=0.0)
+        
+        for binding in bindings:
+            similarities = scores.get(binding.name)
+            if similarities is None or similarities.size == 0:
+                continue
+            
+            if similarities.max() < max(binding.threshold, best_result.confidence):
+                continue
+            
+            result = self._locate_icon(region_cv, binding, similarities, best_first=True)
+            
+            if result.found and result.confidence > best_result.confidence:
+                best_binding = binding
+                best_result = result
+        
+        return best_binding, best_result
+    
+    def _score_region(
+        self,
+        region_cv: np.ndarray,
+        bindings: List[IconBinding],
+        region_gray: Optional[np.ndarray] = None,
+        track: bool = False,
+        prefilter: bool = False,
+        window_hashes: Optional[Dict[Hashable, np.ndarray]] = None,
+        deferred: Optional[List[IconBinding]] = None,
+        record_scan: bool = True
+    ) -> Dict[str, np.ndarray]:
+        if region_gray is None:
+            region_gray = self.matcher.to_gray(region_cv)
+        
+        settings = self.settings
+        by_name = {binding.name: binding for binding in bindings}
+        entries = [self.bank.get(binding.name, binding.template) for binding in bindings]
+        scores: Dict[str, np.ndarray] = {}
+        
+        for size, members, hash_matrix in self.bank.hash_groups(entries):
+            thresholds = np.array([by_name[entry.name].threshold for entry in members])
+            # 模板与监控区域一样大时只有一个位置, 直接对整帧做最近邻查找
+            fixed = size == region_gray.shape[:2] and settings.fixed_slot
+            
+            # 同尺寸的技能图标出现在同一位置, 组内任一技能上次的位置都可作为局部搜索的起点
+            locations = {}
+            if track and not fixed:
+                locations = dict.fromkeys(
+                    by_name[entry.name].last_location
+                    for entry in members
+                    if by_name[entry.name].last_location is not None
+                )
+            
+            # 第一级: 颜色预筛选, 只在要比较的窗口已知时进行 (固定槽位的整帧或上次命中的位置)
+            keep = None
+            color_seconds = 0.0
+            if prefilter and (fixed or locations):
+                x, y = (0, 0) if fixed else next(iter(locations))
+                keep, color_seconds = self._prefilter_colors(region_cv[y:y+size[0], x:x+size[1]], members)
+            
+            # 第二级: 哈希比较
+            start = time.perf_counter()
+            scored = members
+            similarities = None
             
-            screenshot = pyautogui.screenshot(region=region)
-            region_cv = self.matcher.screenshot_to_cv2(screenshot)
+            if fixed:
+                if keep is not None:
+                    self.cascade.record('color', len(members), int((~keep).sum()), color_seconds)
+                    if not keep.any():
+                        continue
+                    scored = list(compress(members, keep))
+                similarities = self._score_fixed_slot(region_gray, members, thresholds, keep)
             
-            for binding in bindings:
-                result = self._find_icon_with_hash(region_cv, binding)
+            elif locations:
+                rejected = 0
+                if keep is not None and keep.any():
+                    scored = list(compress(members, keep))
+                    rejected = len(members) - len(scored)
+                    similarities = self.tracker.search(
+                        region_gray, size, hash_matrix[keep], self.bank.hash_size, thresholds[keep], locations,
+                        window_hashes
+                    )
+                elif keep is None:
+                    similarities = self.tracker.search(
+                        region_gray, size, hash_matrix, self.bank.hash_size, thresholds, locations,
+                        window_hashes
+                    )
                 
-                if result.found:
-                    self._last_match_value = result.confidence
-                    
-                    if self.cast_skill(binding):
-                        return binding.text
+                # 局部搜索未命中时回退到全部成员的完整搜索, 此时颜色筛选不算淘汰
+                if similarities is None:
+                    scored = members
+                    rejected = 0
+                if keep is not None:
+                    self.cascade.record('color', len(members), rejected, color_seconds)
+                
+                if similarities is None and deferred is not None:
+                    # 分批匹配时, 局部搜索未命中的技能留到最后一批再做完整搜索
+                    deferred.extend(by_name[entry.name] for entry in members)
+                    continue
             
-            return None
+            if similarities is None:
+                # 分批匹配同一帧时, 同尺寸的窗口哈希只计算一次
+                packed_windows = window_hashes.get(size) if window_hashes is not None else None
+                if packed_windows is None:
+                    packed_windows = self.matcher.calculate_packed_window_hashes(
+                        region_gray, size, self.bank.hash_size
+                    )
+                    if window_hashes is not None:
+                        window_hashes[size] = packed_windows
+                if packed_windows.size == 0:
+                    continue
+                
+                similarities = self.matcher.calculate_batch_similarities(
+                    packed_windows, hash_matrix, self.bank.hash_bits
+                )
+                if record_scan:
+                    self.tracker.record_full_scan()
             
-        except Exception as e:
-            logger.error(f"处理帧时出错: {e}")
-            return None
+            below = sum(
+                1 for entry, entry_similarities in zip(scored, similarities)
+                if entry_similarities.max() < by_name[entry.name].threshold
+            )
+            self.cascade.record('hash', len(scored), below, time.perf_counter() - start)
+            
+            for entry, entry_similarities in zip(scored, similarities):
+                scores[entry.name] = entry_similarities
+        
+        return scores
+    
+    def _prefilter_colors(
+        self,
+        window: np.ndarray,
+        members: List[CompiledTemplate]
+    ) -> Tuple[np.ndarray, float]:
+        start = time.perf_counter()
+        signature = self.matcher.calculate_color_signature(window)
+        if signature is None:
+            return np.ones(len(members), dtype=bool), time.perf_counter() - start
+        
+        valid, means, hue_hists = self.bank.color_signatures(members)
+        keep = ~valid | (signature.similarities(means, hue_hists) >= self.settings.color_prefilter_threshold)
+        return keep, time.perf_counter() - start
+    
+    def _score_fixed_slot(
+        self,
+        region_gray: np.ndarray,
+        members: List[CompiledTemplate],
+        thresholds: np.ndarray,
+        keep: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        best = None
+        if keep is not None:
+            thresholds = thresholds[keep]
+        
+        # 依次检查 ±fixed_slot_jitter 像素的平移, 任一技能达到阈值即停止
+        for (dx, dy), hash_matrix in self.bank.shifted_hashes(members, self.settings.fixed_slot_jitter):
+            if keep is not None:
+                hash_matrix = hash_matrix[keep]
+            
+            frame_slice, _ = self.bank.shift_slices(region_gray.shape[:2], dx, dy)
+            frame_hash = self.matcher.calculate_hash(region_gray[frame_slice], self.bank.hash_size)
+            
+            distances = np.bitwise_count(hash_matrix ^ frame_hash.words).sum(axis=-1)
+            similarities = 1 - (distances / self.bank.hash_bits)
+            best = similarities if best is None else np.maximum(best, similarities)
+            
+            if (best >= thresholds).any():
+                break
+        
+        self.fixed_slot_count += 1
+        return best[:, None, None]
+    
+    def _locate_icon(
+        self,
+        region_cv: np.ndarray,
+        binding: IconBinding,
+        similarities: np.ndarray,
+        best_first: bool = False
+    ) -> MatchResult:
+        if similarities.size == 0:
+            return MatchResult(found=False, confidence=0.0)
+        
+        entry = self.bank.get(binding.name, binding.template)
+        icon_h, icon_w = entry.size
+        candidates = np.argwhere(similarities >= binding.threshold)
+        
+        if best_first and len(candidates) > 1:
+            order = np.argsort(-similarities[candidates[:, 0], candidates[:, 1]], kind='stable')
+            candidates = candidates[order]
+        
+        settings = self.settings
+        verified = False
+        found = None
+        ncc_seconds = 0.0
+        castable_seconds = 0.0
+        
+        for y, x in candidates:
+            icon_region = region_cv[y:y+icon_h, x:x+icon_w]
+            
+            # 第三级: 可选的 NCC 校验, 排除哈希碰撞造成的误匹配
+            if settings.ncc_verify:
+                start = time.perf_counter()
+                passed = self.matcher.match_template(icon_region, entry.template, settings.ncc_threshold).found
+                ncc_seconds += time.perf_counter() - start
+                if not passed:
+                    continue
+                verified = True
+            
+            # 第四级: 技能是否可释放 (冷却中的图标变灰)
+            start = time.perf_counter()
+            castable = self.matcher.is_skill_castable(icon_region)
+            castable_seconds += time.perf_counter() - start
+            
+            if castable:
+                found = MatchResult(found=True, confidence=similarities[y, x], location=(int(x), int(y)))
+                break
+        
+        if len(candidates):
+            if settings.ncc_verify:
+                self.cascade.record('ncc', 1, int(not verified), ncc_seconds)
+            if verified or not settings.ncc_verify:
+                self.cascade.record('castable', 1, int(found is None), castable_seconds)
+        
+        if found is not None:
+            return found
+        
+        best_y, best_x = np.unravel_index(np.argmax(similarities), similarities.shape)
+        max_similarity = similarities[best_y, best_x]
+        
+        if max_similarity <= 0:
+            return MatchResult(found=False, confidence=0.0)
+        
+        return MatchResult(found=False, confidence=max_similarity, location=(int(best_x), int(best_y)))
     
     def _find_icon_with_hash(self, region_cv: np.ndarray, binding: IconBinding) -> MatchResult:
         try:
-            if len(region_cv.shape) == 3:
-                region_gray = cv2.cvtColor(region_cv, cv2.COLOR_BGR2GRAY)
-            else:
-                region_gray = region_cv
+            similarities = self._score_region(region_cv, [binding]).get(binding.name)
             
-            if len(binding.template.shape) == 3:
-                template_gray = cv2.cvtColor(binding.template, cv2.COLOR_BGR2GRAY)
-            else:
-                template_gray = binding.template
-            
-            icon_hash, _ = self.matcher.calculate_perceptual_hash(template_gray)
-            
-            h, w = region_gray.shape[:2]
-            icon_h, icon_w = template_gray.shape[:2]
-            
-            max_similarity = 0.0
-            best_location = None
-            
-            for y in range(0, h - icon_h + 1):
-                for x in range(0, w - icon_w + 1):
-                    window = region_gray[y:y+icon_h, x:x+icon_w]
-                    
-                    window_hash, _ = self.matcher.calculate_perceptual_hash(window)
-                    
-                    similarity, _ = self.matcher.calculate_hash_similarity(icon_hash, window_hash)
-                    
-                    if similarity > max_similarity:
-                        max_similarity = similarity
-                        best_location = (x, y)
-                    
-                    if similarity >= binding.threshold:
-                        icon_region = region_cv[y:y+icon_h, x:x+icon_w]
-                        
-                        if self.matcher.is_skill_castable(icon_region):
-                            return MatchResult(found=True, confidence=similarity, location=(x, y))
-            
-            return MatchResult(found=False, confidence=max_similarity, location=best_location)
+            if similarities is None:
+                return MatchResult(found=False, confidence=0.0)
             
+            return self._locate_icon(region_cv, binding, similarities)
+        
         except Exception as e:
             logger.error(f"查找图标时出错: {e}")
             return MatchResult(found=False, confidence=0.0)
     
     def _find_max_similarity(self, region_cv: np.ndarray, binding: IconBinding) -> float:
         try:
-            if len(region_cv.shape) == 3:
-                region_gray = cv2.cvtColor(region_cv, cv2.COLOR_BGR2GRAY)
-            else:
-                region_gray = region_cv
+            similarities = self._score_region(region_cv, [binding]).get(binding.name)
             
-            if len(binding.template.shape) == 3:
-                template_gray = cv2.cvtColor(binding.template, cv2.COLOR_BGR2GRAY)
-            else:
-                template_gray = binding.template
-            
-            icon_hash, _ = self.matcher.calculate_perceptual_hash(template_gray)
-            
-            h, w = region_gray.shape[:2]
-            icon_h, icon_w = template_gray.shape[:2]
-            
-            max_similarity = 0.0
-            
-            for y in range(0, h - icon_h + 1):
-                for x in range(0, w - icon_w + 1):
-                    window = region_gray[y:y+icon_h, x:x+icon_w]
-                    
-                    window_hash, _ = self.matcher.calculate_perceptual_hash(window)
-                    
-                    similarity, _ = self.matcher.calculate_hash_similarity(icon_hash, window_hash)
-                    
-                    if similarity > max_similarity:
-                        max_similarity = similarity
-            
-            return max_similarity
+            if similarities is None or similarities.size == 0:
+                return 0.0
             
+            return max(0.0, similarities.max())
+        
         except Exception as e:
             logger.error(f"检查图标相似度时出错: {e}")
             return 1.0
@@ -327,18 +1128,10 @@ class SkillProcessor:
             return None
         
         try:
-            screenshot = pyautogui.screenshot(region=self.monitor_region)
-            region_cv = self.matcher.screenshot_to_cv2(screenshot)
-            
-            new_skill_threshold = self.settings.new_skill_threshold
-            
-            for binding in self.icon_bindings.values():
-                max_sim = self._find_max_similarity(region_cv, binding)
-                if max_sim >= new_skill_threshold:
-                    return None
-            
-            return region_cv
-            
+            region, bindings = self.snapshot()
+            region_cv = self._capture_region(region)
+            return self.evaluate(region, region_cv, bindings, detect_new_skill=True).new_skill
+        
         except Exception as e:
             logger.error(f"检查新技能时出错: {e}")
             return None
@@ -351,8 +1144,43 @@ class SkillProcessor:
     def stop(self):
         with self._lock:
             self.enabled = False
+            self.scheduler.stop()
+            self.save_rotation()
             logger.info("处理器已停止")
     
+    def shutdown(self):
+        self.stop()
+        self.specs.stop_preload()
+        self.config_manager.flush()
+        self.dispatcher.stop()
+        if self._region_pool is not None:
+            self._region_pool.shutdown(wait=False)
+            self._region_pool = None
+        if self._capture is not None:
+            self._capture.close()
+    
     @property
     def is_running(self) -> bool:
         return self.enabled
+    
+    def get_stats(self) -> Dict[str, Dict]:
+        stats = {
+            'gate': self.gate.get_stats(),
+            'scheduler': self.scheduler.get_stats(),
+            'dispatcher': self.dispatcher.get_stats(),
+            'tracking': self.tracker.get_stats(),
+            'fixed_slot': {'ticks': self.fixed_slot_count},
+            'cascade': self.cascade.get_stats(),
+            'specs': self.specs.get_stats(),
+            'persistence': self.config_manager.writer.get_stats(),
+            'rotation': {
+                **self.rotation.get_stats(),
+                'ticks': self.evaluated_tick_count,
+                'avg_bindings_per_tick': (
+                    self.evaluated_binding_count / self.evaluated_tick_count if self.evaluated_tick_count else 0.0
+                ),
+            },
+        }
+        if self._capture is not None:
+            stats['capture'] = self._capture.get_stats()
+        return stats
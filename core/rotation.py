@@ -0,0 +1,80 @@
+from typing import Optional, Dict, Any, List
+
+
+class TransitionTable:
+    def __init__(self, min_samples: int = 5, min_probability: float = 0.2, limit: int = 3):
+        self.min_samples = min_samples
+        self.min_probability = min_probability
+        self.limit = limit
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self.dirty = False
+        
+        self.prediction_count = 0
+        self.prediction_hit_count = 0
+    
+    def record(self, previous: Optional[str], current: str):
+        # 上一次释放的技能 -> 本帧匹配到的技能
+        if previous is None:
+            return
+        
+        row = self._counts.setdefault(previous, {})
+        row[current] = row.get(current, 0) + 1
+        self.dirty = True
+    
+    def predict(self, previous: Optional[str], names: List[str]) -> List[str]:
+        # 按转移概率从高到低返回最可能的几个技能, 样本不足时返回空列表
+        row = self._counts.get(previous) if previous is not None else None
+        if not row:
+            return []
+        
+        total = sum(row.values())
+        if total < self.min_samples:
+            return []
+        
+        available = set(names)
+        ranked = sorted(
+            (name for name, count in row.items() if name in available and count / total >= self.min_probability),
+            key=lambda name: row[name],
+            reverse=True
+        )
+        return ranked[:self.limit]
+    
+    def record_prediction(self, hit: bool):
+        self.prediction_count += 1
+        if hit:
+            self.prediction_hit_count += 1
+    
+    def remove(self, name: str):
+        if self._counts.pop(name, None) is not None:
+            self.dirty = True
+        for row in self._counts.values():
+            if row.pop(name, None) is not None:
+                self.dirty = True
+    
+    def clear(self):
+        self._counts.clear()
+        self.dirty = False
+    
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        return {previous: dict(row) for previous, row in self._counts.items()}
+    
+    def load_dict(self, data: Dict[str, Dict[str, int]]):
+        self._counts = {
+            previous: {name: int(count) for name, count in row.items()}
+            for previous, row in data.items()
+        }
+        self.dirty = False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'transitions': sum(len(row) for row in self._counts.values()),
+            'predictions': self.prediction_count,
+            'prediction_hits': self.prediction_hit_count,
+            'prediction_hit_ratio': (
+                self.prediction_hit_count / self.prediction_count if self.prediction_count else 0.0
+            ),
+        }
+    
+    def reset_stats(self):
+        self.prediction_count = 0
+        self.prediction_hit_count = 0
@@ -0,0 +1,161 @@
+from collections import deque
+from typing import Optional, Dict, Any, Callable
+import math
+import threading
+import time
+import numpy as np
+
+from core.config import AppSettings
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+class ScanScheduler:
+    def __init__(
+        self,
+        target_rate: float = 3.0,
+        min_rate: float = 1.0,
+        max_rate: float = 30.0,
+        idle_ticks: int = 10,
+        backoff_factor: float = 2.0,
+        clock: Callable[[], float] = time.perf_counter,
+        history: int = 256
+    ):
+        self.clock = clock
+        self.target_rate = target_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.idle_ticks = idle_ticks
+        self.backoff_factor = backoff_factor
+        
+        self._stop_event = threading.Event()
+        self._next_deadline: Optional[float] = None
+        self._rate = self.full_rate
+        self._idle_streak = 0
+        
+        self._wake_times: deque = deque(maxlen=history)
+        self._jitters: deque = deque(maxlen=history)
+        self.tick_count = 0
+        self.missed_count = 0
+        self.backoff_count = 0
+    
+    @classmethod
+    def from_settings(cls, settings: AppSettings, **kwargs) -> 'ScanScheduler':
+        scheduler = cls(**kwargs)
+        scheduler.configure(settings)
+        return scheduler
+    
+    def configure(self, settings: AppSettings):
+        full_rate = self.full_rate
+        
+        self.target_rate = 1.0 / settings.scan_interval
+        self.min_rate = settings.min_scan_rate
+        self.max_rate = settings.max_scan_rate
+        self.idle_ticks = settings.idle_backoff_ticks
+        self.backoff_factor = settings.idle_backoff_factor
+        
+        if self._idle_streak < self.idle_ticks or self.full_rate != full_rate:
+            self._rate = self.full_rate
+    
+    @property
+    def full_rate(self) -> float:
+        return min(self.target_rate, self.max_rate)
+    
+    @property
+    def floor_rate(self) -> float:
+        return min(self.min_rate, self.full_rate)
+    
+    @property
+    def current_rate(self) -> float:
+        return self._rate
+    
+    @property
+    def interval(self) -> float:
+        return 1.0 / self._rate
+    
+    def start(self):
+        self._stop_event.clear()
+        self._next_deadline = self.clock()
+        self._rate = self.full_rate
+        self._idle_streak = 0
+    
+    def stop(self):
+        self._stop_event.set()
+    
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+    
+    def wait(self) -> bool:
+        # 睡到绝对截止时间, 而不是在本次工作之后再固定睡 scan_interval, 这样处理耗时不会累积成漂移
+        if self._next_deadline is None:
+            self.start()
+        
+        delay = self._next_deadline - self.clock()
+        if delay > 0 and self._stop_event.wait(delay):
+            return False
+        
+        now = self.clock()
+        self._jitters.append(now - self._next_deadline)
+        self._wake_times.append(now)
+        self.tick_count += 1
+        return not self._stop_event.is_set()
+    
+    def advance(self, idle: bool = False):
+        if idle:
+            self._idle_streak += 1
+            if self._idle_streak % self.idle_ticks == 0 and self._rate > self.floor_rate:
+                self._rate = max(self.floor_rate, self._rate / self.backoff_factor)
+                self.backoff_count += 1
+                logger.debug(f"监控区域空闲, 降低扫描频率至 {self._rate:.2f}Hz")
+        else:
+            if self._idle_streak >= self.idle_ticks and self._rate != self.full_rate:
+                logger.debug(f"监控区域变化, 恢复扫描频率至 {self.full_rate:.2f}Hz")
+            self._idle_streak = 0
+            self._rate = self.full_rate
+        
+        interval = self.interval
+        deadline = self._next_deadline + interval
+        now = self.clock()
+        
+        # 错过截止时间时跳过已错过的节拍, 保持相位而不是连续补跑
+        if deadline < now:
+            skipped = math.ceil((now - deadline) / interval)
+            self.missed_count += skipped
+            deadline += skipped * interval
+        
+        self._next_deadline = deadline
+    
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            'ticks': self.tick_count,
+            'target_hz': self.full_rate,
+            'current_hz': self._rate,
+            'achieved_hz': 0.0,
+            'missed': self.missed_count,
+            'backoffs': self.backoff_count,
+            'jitter_p50_ms': 0.0,
+            'jitter_p95_ms': 0.0,
+            'jitter_p99_ms': 0.0,
+        }
+        
+        if len(self._wake_times) > 1:
+            elapsed = self._wake_times[-1] - self._wake_times[0]
+            if elapsed > 0:
+                stats['achieved_hz'] = (len(self._wake_times) - 1) / elapsed
+        
+        if self._jitters:
+            p50, p95, p99 = np.percentile(np.array(self._jitters) * 1000, [50, 95, 99])
+            stats['jitter_p50_ms'] = float(p50)
+            stats['jitter_p95_ms'] = float(p95)
+            stats['jitter_p99_ms'] = float(p99)
+        
+        return stats
+    
+    def reset_stats(self):
+        self._wake_times.clear()
+        self._jitters.clear()
+        self.tick_count = 0
+        self.missed_count = 0
+        self.backoff_count = 0
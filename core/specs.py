@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, List
+import threading
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+class SpecCache:
+    # 已加载配置的 LRU 缓存; 超过内存上限时淘汰最久未用的配置, 再次切换时从磁盘上的模板缓存重建
+    def __init__(self, build: Callable[[str], Optional[Any]], memory_limit: int):
+        self._build = build
+        self.memory_limit = memory_limit
+        self.active: Optional[str] = None
+        
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        
+        self.hit_count = 0
+        self.miss_count = 0
+        self.eviction_count = 0
+        self.preload_count = 0
+    
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+    
+    def get(self, name: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+                self.hit_count += 1
+                return entry
+            self.miss_count += 1
+        
+        # 构建在锁外进行, 后台预加载不会阻塞切换
+        entry = self._build(name)
+        if entry is not None:
+            self.put(name, entry)
+        return entry
+    
+    def peek(self, name: str) -> Optional[Any]:
+        with self._lock:
+            return self._entries.get(name)
+    
+    def put(self, name: str, entry: Any):
+        with self._lock:
+            self._entries[name] = entry
+            self._entries.move_to_end(name)
+            self._evict(keep=name)
+    
+    def discard(self, name: str):
+        with self._lock:
+            self._entries.pop(name, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def _evict(self, keep: str):
+        # 正在使用的和刚放入 (即将切换到) 的配置不淘汰
+        total = sum(entry.nbytes for entry in self._entries.values())
+        for name in list(self._entries):
+            if total <= self.memory_limit:
+                break
+            if name == self.active or name == keep:
+                continue
+            total -= self._entries.pop(name).nbytes
+            self.eviction_count += 1
+            logger.debug(f"配置缓存超出上限, 移出: {name}")
+    
+    def preload(self, names: List[str]):
+        # 在后台依次加载尚未常驻的配置, 内存用满后停止, 不为预加载淘汰已有配置
+        self.stop_preload()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._preload, args=(list(names),), name="SpecPreloader", daemon=True)
+        self._thread.start()
+    
+    def stop_preload(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(2.0)
+        self._thread = None
+    
+    def _preload(self, names: List[str]):
+        for name in names:
+            if self._stop_event.is_set():
+                return
+            if self.peek(name) is not None:
+                continue
+            
+            try:
+                entry = self._build(name)
+            except Exception as e:
+                logger.error(f"预加载配置失败 {name}: {e}")
+                continue
+            if entry is None:
+                continue
+            
+            with self._lock:
+                if name in self._entries:
+                    continue
+                if sum(item.nbytes for item in self._entries.values()) + entry.nbytes > self.memory_limit:
+                    logger.debug(f"配置缓存已满, 停止预加载: {name}")
+                    return
+                # 预加载的配置排在最久未用的一端, 不挤掉用户刚用过的配置
+                self._entries[name] = entry
+                self._entries.move_to_end(name, last=False)
+                self.preload_count += 1
+        
+        logger.info(f"配置预加载完成: 常驻 {len(self._entries)} 个")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'resident': list(self._entries),
+                'nbytes': sum(entry.nbytes for entry in self._entries.values()),
+                'memory_limit': self.memory_limit,
+                'hits': self.hit_count,
+                'misses': self.miss_count,
+                'evictions': self.eviction_count,
+                'preloaded': self.preload_count,
+            }
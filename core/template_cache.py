@@ -0,0 +1,123 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple
+import hashlib
+import os
+
+import numpy as np
+
+from core.bank import CompiledTemplate, TemplateBank
+from core.matcher import ImageMatcher, PerceptualHash, ColorSignature
+
+# 缓存格式变化时加一, 旧缓存会被整体丢弃
+CACHE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class TemplateSource:
+    # 生成缓存时 PNG 的修改时间、大小和内容摘要
+    mtime_ns: int
+    size: int
+    digest: str
+    
+    def matches(self, stat: os.stat_result) -> bool:
+        return self.mtime_ns == stat.st_mtime_ns and self.size == stat.st_size
+    
+    @classmethod
+    def from_bytes(cls, stat: os.stat_result, data: bytes) -> 'TemplateSource':
+        return cls(stat.st_mtime_ns, stat.st_size, hashlib.sha1(data).hexdigest())
+
+
+def pack_templates(
+    entries: List[CompiledTemplate],
+    sources: List[TemplateSource],
+    hash_size: int
+) -> Dict[str, np.ndarray]:
+    # 所有模板和灰度图拼成两个一维数组, 其余特征按行存放, 整个缓存只有固定的十几个数组
+    shapes = np.array(
+        [entry.template.shape[:2] + (entry.template.shape[2] if entry.template.ndim == 3 else 0,) for entry in entries],
+        dtype=np.int64
+    ).reshape(-1, 3)
+    colors = [entry.color for entry in entries]
+    
+    return {
+        'version': np.array(CACHE_VERSION),
+        'names': np.array([entry.name for entry in entries], dtype=str),
+        'shapes': shapes,
+        'pixels': np.concatenate([entry.template.reshape(-1) for entry in entries] or [np.zeros(0, np.uint8)]),
+        'grays': np.concatenate([entry.gray.reshape(-1) for entry in entries] or [np.zeros(0, np.uint8)]),
+        'hash_size': np.array(hash_size),
+        'hash_words': np.array([entry.packed_hash for entry in entries], dtype=np.uint64),
+        'saturation': np.array(
+            [np.nan if entry.saturation is None else entry.saturation for entry in entries], dtype=np.float64
+        ),
+        'color_valid': np.array([color is not None for color in colors], dtype=bool),
+        'color_means': np.array(
+            [color.mean if color is not None else np.zeros(3) for color in colors], dtype=np.float64
+        ).reshape(-1, 3),
+        'hue_hists': np.array(
+            [color.hue_hist if color is not None else np.zeros(ImageMatcher.HUE_BINS) for color in colors],
+            dtype=np.float32
+        ).reshape(-1, ImageMatcher.HUE_BINS),
+        'mtime_ns': np.array([source.mtime_ns for source in sources], dtype=np.int64),
+        'file_size': np.array([source.size for source in sources], dtype=np.int64),
+        'digest': np.array([source.digest for source in sources], dtype=str),
+    }
+
+
+def unpack_templates(
+    arrays: Dict[str, np.ndarray],
+    bank: TemplateBank
+) -> Dict[str, Tuple[TemplateSource, CompiledTemplate]]:
+    if not arrays or int(arrays.get('version', -1)) != CACHE_VERSION:
+        return {}
+    
+    shapes = arrays['shapes']
+    sizes = np.where(shapes[:, 2] > 0, shapes[:, 0] * shapes[:, 1] * shapes[:, 2], shapes[:, 0] * shapes[:, 1])
+    pixel_offsets = np.concatenate([[0], np.cumsum(sizes)])
+    gray_offsets = np.concatenate([[0], np.cumsum(shapes[:, 0] * shapes[:, 1])])
+    
+    # 哈希尺寸改了只需从缓存的灰度图重新计算哈希, 不必重新解码 PNG
+    cached_hash_size = int(arrays['hash_size'])
+    
+    result = {}
+    for i, name in enumerate(arrays['names'].tolist()):
+        h, w, c = (int(value) for value in shapes[i])
+        template = arrays['pixels'][pixel_offsets[i]:pixel_offsets[i + 1]].reshape((h, w, c) if c else (h, w))
+        gray = arrays['grays'][gray_offsets[i]:gray_offsets[i + 1]].reshape(h, w)
+        
+        if cached_hash_size == bank.hash_size:
+            phash = PerceptualHash(arrays['hash_words'][i].copy(), cached_hash_size)
+        else:
+            phash = bank.matcher.calculate_hash(gray, bank.hash_size)
+        
+        saturation = float(arrays['saturation'][i])
+        color = None
+        if arrays['color_valid'][i]:
+            color = ColorSignature(mean=arrays['color_means'][i].copy(), hue_hist=arrays['hue_hists'][i].copy())
+        
+        entry = CompiledTemplate(
+            name=name,
+            template=template,
+            gray=gray,
+            phash=phash,
+            saturation=None if np.isnan(saturation) else saturation,
+            color=color
+        )
+        source = TemplateSource(
+            int(arrays['mtime_ns'][i]),
+            int(arrays['file_size'][i]),
+            str(arrays['digest'][i])
+        )
+        result[name] = (source, entry)
+    
+    return result
+
+
+def read_template_source(path: Path) -> Optional[Tuple[TemplateSource, bytes]]:
+    try:
+        stat = path.stat()
+        data = path.read_bytes()
+    except OSError:
+        return None
+    return TemplateSource.from_bytes(stat, data), data
@@ -0,0 +1,95 @@
+from typing import Optional, Dict, Any, Tuple, Iterable, Hashable
+import numpy as np
+
+from core.matcher import ImageMatcher
+
+
+class LocationTracker:
+    def __init__(self, matcher: ImageMatcher, radius: int = 2, revalidate_ticks: int = 30):
+        self.matcher = matcher
+        self.radius = radius
+        self.revalidate_ticks = revalidate_ticks
+        self._ticks_since_full_scan = 0
+        
+        self.hit_count = 0
+        self.miss_count = 0
+        self.full_scan_count = 0
+        self.revalidate_count = 0
+    
+    def begin_tick(self) -> bool:
+        # 返回本帧是否允许走局部搜索; 每隔 revalidate_ticks 帧强制完整扫描一次
+        self._ticks_since_full_scan += 1
+        if self._ticks_since_full_scan > self.revalidate_ticks:
+            self.revalidate_count += 1
+            return False
+        return True
+    
+    def record_full_scan(self):
+        self.full_scan_count += 1
+        self._ticks_since_full_scan = 0
+    
+    def search(
+        self,
+        gray: np.ndarray,
+        size: Tuple[int, int],
+        hash_matrix: np.ndarray,
+        hash_size: int,
+        thresholds: np.ndarray,
+        locations: Iterable[Tuple[int, int]],
+        window_hashes: Optional[Dict[Hashable, np.ndarray]] = None
+    ) -> Optional[np.ndarray]:
+        # 先用上次位置的单个窗口确认, 再扩大到 ±radius 邻域, 都未命中时返回 None 交给完整搜索
+        win_h, win_w = size
+        rows = gray.shape[0] - win_h + 1
+        cols = gray.shape[1] - win_w + 1
+        hash_bits = hash_size * hash_size
+        
+        for x, y in locations:
+            if not (0 <= x < cols and 0 <= y < rows):
+                continue
+            
+            for k in sorted({0, self.radius}):
+                y0, y1 = max(0, y - k), min(rows, y + k + 1)
+                x0, x1 = max(0, x - k), min(cols, x + k + 1)
+                
+                # 同一帧分批搜索时复用已经算过的邻域哈希
+                key = (size, y0, y1, x0, x1)
+                packed_windows = window_hashes.get(key) if window_hashes is not None else None
+                if packed_windows is None:
+                    packed_windows = self.matcher.calculate_packed_window_hashes(
+                        gray[y0:y1+win_h-1, x0:x1+win_w-1], size, hash_size
+                    )
+                    if window_hashes is not None:
+                        window_hashes[key] = packed_windows
+                similarities = self.matcher.calculate_batch_similarities(
+                    packed_windows, hash_matrix, hash_bits
+                )
+                
+                if (similarities.max(axis=(1, 2)) >= thresholds).any():
+                    self.hit_count += 1
+                    scores = np.zeros((len(hash_matrix), rows, cols))
+                    scores[:, y0:y1, x0:x1] = similarities
+                    return scores
+        
+        self.miss_count += 1
+        return None
+    
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hit_count + self.miss_count
+        return self.hit_count / total if total else 0.0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'hits': self.hit_count,
+            'misses': self.miss_count,
+            'hit_ratio': self.hit_ratio,
+            'full_scans': self.full_scan_count,
+            'revalidations': self.revalidate_count,
+        }
+    
+    def reset_stats(self):
+        self.hit_count = 0
+        self.miss_count = 0
+        self.full_scan_count = 0
+        self.revalidate_count = 0
@@ -14,17 +14,68 @@ else:
 
 locale.setlocale(locale.LC_ALL, 'zh_CN.UTF-8' if sys.platform != 'win32' else 'Chinese')
 
-from utils.logger import setup_logger
-from ui.main_window import MainWindow
+# 导入计时要在其余模块导入之前安装, 因此直接检查命令行而不是等 argparse 解析完
+from utils.startup import StartupProfiler
+
+profiler = StartupProfiler().install() if '--profile-startup' in sys.argv[1:] else None
+
+import argparse
+import threading
+
+from utils.logger import setup_logger, set_console_stream
 
 logger = setup_logger()
 
 
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="WOW 技能辅助工具")
+    parser.add_argument('--headless', action='store_true', help="不启动界面, 直接运行指定配置")
+    parser.add_argument('--spec', help="无界面模式使用的配置名称")
+    parser.add_argument('--duration', type=float, help="无界面模式运行秒数, 默认一直运行")
+    parser.add_argument('--stats-json', help="退出时写入统计信息的文件, '-' 表示输出到标准输出")
+    parser.add_argument('--profile-startup', action='store_true', help="配置加载完成后输出启动耗时和各模块导入耗时")
+    args = parser.parse_args(argv)
+    
+    if args.headless and not args.spec:
+        parser.error("--headless 需要同时指定 --spec")
+    return args
+
+
+def report_startup(ready: threading.Event, label: str):
+    # 等到可以开始监控 (配置加载完成) 时输出报告, 不阻塞界面线程
+    def wait_and_report():
+        ready.wait()
+        profiler.mark(label)
+        profiler.uninstall()
+        profiler.report()
+    
+    threading.Thread(target=wait_and_report, name="StartupReport", daemon=True).start()
+
+
 def main():
+    args = parse_args()
+    if args.headless:
+        # --stats-json - 把统计信息写到标准输出, 日志全部改到 stderr
+        set_console_stream(sys.stderr)
     logger.info("启动 WOW 技能辅助工具...")
     
+    if profiler is not None:
+        profiler.mark("参数解析")
+    
     try:
+        if args.headless:
+            # 无界面模式不导入 ui 包, 不加载 customtkinter/tkinter/pynput
+            from core.headless import HeadlessRunner
+            runner = HeadlessRunner(args.spec, duration=args.duration, stats_path=args.stats_json)
+            if profiler is not None:
+                report_startup(runner.started, "开始监控")
+            sys.exit(runner.run())
+        
+        from ui.main_window import MainWindow
         app = MainWindow()
+        if profiler is not None:
+            profiler.mark("窗口创建")
+            report_startup(app.config_loaded, "配置加载完成")
         app.run()
     except Exception as e:
         logger.error(f"程序运行出错: {e}")
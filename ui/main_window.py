@@ -6,20 +6,24 @@ from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
 import customtkinter as ctk
-import cv2
 import numpy as np
-import pyautogui
-from PIL import Image, ImageTk
-from pynput import keyboard as kb
 import tkinter as tk
 
 from core.config import ConfigManager, AppSettings
 from core.processor import SkillProcessor, IconBinding
+from core.pipeline import SkillPipeline
 from core.matcher import ImageMatcher
 from ui.region_selector import RegionSelector
 from ui.settings_dialog import SettingsDialog
+from utils.lazy import lazy_import
 from utils.logger import get_logger
 
+cv2 = lazy_import('cv2')
+pyautogui = lazy_import('pyautogui')
+Image = lazy_import('PIL.Image')
+ImageTk = lazy_import('PIL.ImageTk')
+kb = lazy_import('pynput.keyboard')
+
 logger = get_logger()
 
 
@@ -37,6 +41,7 @@ class MainWindow:
         self._setup_theme()
         
         self.running = False
+        self.pipeline: Optional[SkillPipeline] = None
         self.auto_add_enabled = True
         self.adding_new_skill = False
         self._last_key_time = {}
@@ -44,11 +49,21 @@ class MainWindow:
         self._settings_window = None
         self._settings_dialog = None
         self._window_initialized = False
+        self.current_spec = ""
+        self.config_loaded = threading.Event()
         
-        self._load_last_config()
+        history = self.config_manager.load_history()
+        self._restore_window_layout(history)
         self._setup_ui()
         self._setup_hotkeys()
         
+        # 窗口先显示, 上次的配置在后台线程加载 (解码模板时才导入 cv2), 主线程轮询加载完成
+        self._config_loader = threading.Thread(
+            target=self._load_last_config, args=(history,), name="ConfigLoader", daemon=True
+        )
+        self._config_loader.start()
+        self.root.after(20, self._wait_for_config)
+        
         self.root.protocol("WM_DELETE_WINDOW", self._quit_app)
         self.root.bind("<Configure>", self._on_window_configure)
         
@@ -74,9 +89,7 @@ class MainWindow:
         ctk.set_appearance_mode("dark")
         ctk.set_default_color_theme("blue")
     
-    def _load_last_config(self):
-        history = self.config_manager.load_history()
-        
+    def _load_last_config(self, history: Dict[str, Any]):
         specs = self.config_manager.get_available_specs()
         self.current_spec = history.get("last_spec", "")
         
@@ -96,7 +109,19 @@ class MainWindow:
             self.processor.monitor_region = tuple(history["monitor_region"])
         
         self.auto_add_enabled = self.processor.settings.auto_add_skills
+    
+    def _wait_for_config(self):
+        if self._config_loader.is_alive():
+            self.root.after(20, self._wait_for_config)
+            return
         
+        self.config_loaded.set()
+        self._update_binding_list()
+        self._update_title()
+        # 其余配置在后台预加载, 之后切换配置不需要等待读取和解码模板
+        self.processor.preload_specs()
+    
+    def _restore_window_layout(self, history: Dict[str, Any]):
         window_config = history.get("window", {})
         if window_config:
             self._restore_window_position(window_config)
@@ -238,6 +263,9 @@ class MainWindow:
             return spec_name[-max_length:]
     
     def _update_title(self):
+        if not self.config_loaded.is_set():
+            return
+        
         if self.current_spec:
             auto_status = "ON" if self.auto_add_enabled else "OFF"
             self.root.title(f"孟子 - {self._get_display_name(self.current_spec)} [{auto_status}]")
@@ -251,7 +279,7 @@ class MainWindow:
         if not self.processor.icon_bindings:
             ctk.CTkLabel(
                 self.bindings_grid,
-                text="暂无技能绑定",
+                text="暂无技能绑定" if self.config_loaded.is_set() else "正在加载配置...",
                 font=("Arial", 12)
             ).pack(pady=10)
             self._adjust_window_size(0)
@@ -380,6 +408,10 @@ class MainWindow:
             self.status_label.configure(text=f"已删除绑定: {binding_name}")
     
     def _toggle_monitoring(self):
+        if not self.config_loaded.is_set():
+            self.status_label.configure(text="正在加载配置...")
+            return
+        
         if not self.processor.monitor_region:
             self.status_label.configure(text="请先设置监控区域")
             return
@@ -405,20 +437,38 @@ class MainWindow:
             self.status_label.configure(text="已停止")
     
     def _start_monitoring_thread(self):
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
+        
+        if self.processor.settings.pipelined:
+            self.pipeline = SkillPipeline(
+                self.processor,
+                detect_new_skill=lambda: self.auto_add_enabled and self.processor.settings.auto_add_skills,
+                on_new_skill=self._auto_add_skill
+            )
+            self.pipeline.start()
+            return
+        
         thread = threading.Thread(target=self._monitor_loop, daemon=True)
         thread.start()
     
     def _monitor_loop(self):
-        while self.running:
+        scheduler = self.processor.scheduler
+        scheduler.configure(self.processor.settings)
+        scheduler.start()
+        
+        while self.running and scheduler.wait():
             try:
-                self.processor.process_frame()
+                scheduler.configure(self.processor.settings)
+                
+                detect_new_skill = self.auto_add_enabled and self.processor.settings.auto_add_skills
+                result = self.processor.tick(detect_new_skill=detect_new_skill)
                 
-                if self.auto_add_enabled and self.processor.settings.auto_add_skills:
-                    new_skill_img = self.processor.check_for_new_skill()
-                    if new_skill_img is not None:
-                        self._auto_add_skill(new_skill_img)
+                if result.new_skill is not None:
+                    self._auto_add_skill(result.new_skill)
                 
-                time.sleep(self.processor.settings.scan_interval)
+                scheduler.advance(idle=result.idle)
             except Exception as e:
                 logger.error(f"监控循环出错: {e}")
                 self.root.after(0, lambda: self._on_monitoring_error(str(e)))
@@ -504,6 +554,10 @@ class MainWindow:
             preview.destroy()
     
     def _show_settings(self):
+        if not self.config_loaded.is_set():
+            self.status_label.configure(text="正在加载配置...")
+            return
+        
         if self._settings_window is not None:
             try:
                 self._settings_window.focus()
@@ -513,8 +567,11 @@ class MainWindow:
         
         def on_save(settings: dict, region: Optional[Tuple[int, int, int, int]]):
             if self.config_manager.current_config:
-                new_settings = AppSettings.from_dict(settings)
+                current = self.config_manager.current_config.settings
+                new_settings = AppSettings.from_dict({**current.to_dict(), **settings})
                 self.config_manager.current_config.settings = new_settings
+                if new_settings.capture_backend != current.capture_backend:
+                    self.processor.set_capture_backend(None)
                 self.auto_add_enabled = new_settings.auto_add_skills
                 if region:
                     self.processor.monitor_region = region
@@ -558,20 +615,17 @@ class MainWindow:
         self._settings_window = dialog.window
         self._settings_dialog = dialog
         if self._settings_window:
-            self._settings_window.protocol("WM_DELETE_WINDOW", lambda: (setattr(self, '_settings_window', None), setattr(self, '_settings_dialog', None), dialog.window.destroy()))
+            self._settings_window.protocol("WM_DELETE_WINDOW", lambda: (setattr(self, '_settings_window', None), setattr(self, '_settings_dialog', None), dialog.close()))
     
     def _on_spec_change(self, new_spec: str):
         if new_spec == self.current_spec:
             return
         
-        self.running = False
-        self.processor.stop()
-        
+        # 处理器原子地替换绑定快照, 监控不中断
         if self.processor.load_config(new_spec):
             self.current_spec = new_spec
             self._update_binding_list()
             self._update_title()
-            self.start_btn.configure(text="开始监控 (~)", fg_color="#3B8ED0")
     
     def _create_new_spec(self):
         dialog = ctk.CTkInputDialog(
@@ -590,7 +644,7 @@ class MainWindow:
                 spec_name=spec_name,
                 monitor_region=self.processor.monitor_region
             )
-            self.config_manager.save_spec(new_config)
+            self.config_manager.save_spec(new_config, wait=True)
             
             self.current_spec = spec_name
             self.processor.load_config(spec_name)
@@ -605,6 +659,7 @@ class MainWindow:
             return
         
         if self.config_manager.delete_spec(target_spec):
+            self.processor.forget_spec(target_spec)
             specs = self.config_manager.get_available_specs()
             
             if target_spec == self.current_spec:
@@ -636,6 +691,7 @@ class MainWindow:
         self.root.after(0, lambda: self.status_label.configure(text=status))
     
     def _on_window_configure(self, event):
+        # 拖动窗口时只在停下 1 秒后提交一次, ConfigManager 再跳过内容未变的写入
         if event.widget == self.root and self._window_initialized:
             if hasattr(self, '_save_timer'):
                 self.root.after_cancel(self._save_timer)
@@ -645,6 +701,10 @@ class MainWindow:
         self._window_initialized = True
     
     def _save_last_config(self):
+        # 配置加载完成前 current_spec 还是空的, 不能覆盖上次的记录
+        if not self.config_loaded.is_set():
+            return
+        
         history = {
             "last_spec": self.current_spec,
             "settings": self.processor.settings.to_dict(),
@@ -672,8 +732,13 @@ class MainWindow:
     def _quit_app(self):
         try:
             self.running = False
-            self.processor.stop()
+            # 先提交最后的窗口状态和设置窗口中未保存的修改, shutdown 会等待写入线程写完所有未完成的文件
+            if hasattr(self, '_save_timer'):
+                self.root.after_cancel(self._save_timer)
+            if self._settings_dialog:
+                self._settings_dialog.flush_pending_save()
             self._save_last_config()
+            self.processor.shutdown()
             
             if hasattr(self, 'keyboard_listener'):
                 self.keyboard_listener.stop()
@@ -1,11 +1,14 @@
 from typing import Callable, Optional, Tuple
 import threading
 import tkinter as tk
-from PIL import Image, ImageTk
-import pyautogui
 
+from utils.lazy import lazy_import
 from utils.logger import get_logger
 
+Image = lazy_import('PIL.Image')
+ImageTk = lazy_import('PIL.ImageTk')
+pyautogui = lazy_import('pyautogui')
+
 logger = get_logger()
 
 
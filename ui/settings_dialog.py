@@ -8,6 +8,9 @@ logger = get_logger()
 
 
 class SettingsDialog:
+    # 输入框失去焦点和回车常常接连触发, 合并成一次保存
+    REALTIME_SAVE_DELAY_MS = 300
+    
     def __init__(
         self,
         parent,
@@ -37,6 +40,7 @@ class SettingsDialog:
         self.window: Optional[ctk.CTkToplevel] = None
         self.spec_dropdown = None
         self.spec_var = None
+        self._save_timer: Optional[str] = None
     
     def update_specs(self, specs: List[str], current_spec: str):
         self.available_specs = specs
@@ -148,16 +152,16 @@ class SettingsDialog:
         self.scan_var = ctk.StringVar(value=str(self.settings.scan_interval))
         scan_entry = ctk.CTkEntry(row1, textvariable=self.scan_var, width=40)
         scan_entry.pack(side="left", padx=2)
-        scan_entry.bind("<FocusOut>", lambda e: self._save_realtime())
-        scan_entry.bind("<Return>", lambda e: self._save_realtime())
+        scan_entry.bind("<FocusOut>", lambda e: self._schedule_realtime_save())
+        scan_entry.bind("<Return>", lambda e: self._schedule_realtime_save())
         ctk.CTkLabel(row1, text="秒", text_color="gray", width=10).pack(side="left")
         
         ctk.CTkLabel(row1, text="阈值:", width=30).pack(side="left", padx=(10, 0))
         self.threshold_var = ctk.StringVar(value=str(self.settings.threshold))
         threshold_entry = ctk.CTkEntry(row1, textvariable=self.threshold_var, width=40)
         threshold_entry.pack(side="left", padx=2)
-        threshold_entry.bind("<FocusOut>", lambda e: self._save_realtime())
-        threshold_entry.bind("<Return>", lambda e: self._save_realtime())
+        threshold_entry.bind("<FocusOut>", lambda e: self._schedule_realtime_save())
+        threshold_entry.bind("<Return>", lambda e: self._schedule_realtime_save())
         
         row2 = ctk.CTkFrame(inner_frame, fg_color="transparent")
         row2.pack(fill="x", pady=1)
@@ -166,16 +170,16 @@ class SettingsDialog:
         self.delay_var = ctk.StringVar(value=str(self.settings.key_press_delay))
         delay_entry = ctk.CTkEntry(row2, textvariable=self.delay_var, width=40)
         delay_entry.pack(side="left", padx=2)
-        delay_entry.bind("<FocusOut>", lambda e: self._save_realtime())
-        delay_entry.bind("<Return>", lambda e: self._save_realtime())
+        delay_entry.bind("<FocusOut>", lambda e: self._schedule_realtime_save())
+        delay_entry.bind("<Return>", lambda e: self._schedule_realtime_save())
         ctk.CTkLabel(row2, text="秒", text_color="gray", width=10).pack(side="left")
         
         ctk.CTkLabel(row2, text="热键:", width=30).pack(side="left", padx=(10, 0))
         self.hotkey_var = ctk.StringVar(value=self.settings.monitor_hotkey)
         hotkey_entry = ctk.CTkEntry(row2, textvariable=self.hotkey_var, width=40)
         hotkey_entry.pack(side="left", padx=2)
-        hotkey_entry.bind("<FocusOut>", lambda e: self._save_realtime())
-        hotkey_entry.bind("<Return>", lambda e: self._save_realtime())
+        hotkey_entry.bind("<FocusOut>", lambda e: self._schedule_realtime_save())
+        hotkey_entry.bind("<Return>", lambda e: self._schedule_realtime_save())
         
         row3 = ctk.CTkFrame(inner_frame, fg_color="transparent")
         row3.pack(fill="x", pady=1)
@@ -184,8 +188,8 @@ class SettingsDialog:
         self.new_skill_var = ctk.StringVar(value=str(self.settings.new_skill_threshold))
         new_skill_entry = ctk.CTkEntry(row3, textvariable=self.new_skill_var, width=40)
         new_skill_entry.pack(side="left", padx=2)
-        new_skill_entry.bind("<FocusOut>", lambda e: self._save_realtime())
-        new_skill_entry.bind("<Return>", lambda e: self._save_realtime())
+        new_skill_entry.bind("<FocusOut>", lambda e: self._schedule_realtime_save())
+        new_skill_entry.bind("<Return>", lambda e: self._schedule_realtime_save())
         ctk.CTkLabel(row3, text="阈值", text_color="gray", width=10).pack(side="left")
         
         self.auto_add_var = ctk.BooleanVar(value=self.settings.auto_add_skills)
@@ -193,7 +197,7 @@ class SettingsDialog:
             row3,
             text="自动添加",
             variable=self.auto_add_var,
-            command=self._save_realtime,
+            command=self._schedule_realtime_save,
             width=80
         )
         auto_switch.pack(side="left", padx=(10, 0))
@@ -262,7 +266,7 @@ class SettingsDialog:
         ctk.CTkButton(
             btn_frame,
             text="关闭",
-            command=self.window.destroy,
+            command=self.close,
             width=45,
             height=24
         ).pack(side="left", padx=2)
@@ -278,7 +282,25 @@ class SettingsDialog:
     def _create_buttons(self, parent):
         pass
     
+    def _schedule_realtime_save(self):
+        # 计时器挂在父窗口上, 设置窗口关闭后也不会失效
+        if self._save_timer is not None:
+            self.parent.after_cancel(self._save_timer)
+        self._save_timer = self.parent.after(self.REALTIME_SAVE_DELAY_MS, self._save_realtime)
+    
+    def flush_pending_save(self):
+        if self._save_timer is not None:
+            self._save_realtime()
+    
+    def close(self):
+        self.flush_pending_save()
+        self.window.destroy()
+    
     def _save_realtime(self):
+        if self._save_timer is not None:
+            self.parent.after_cancel(self._save_timer)
+            self._save_timer = None
+        
         try:
             new_settings = {
                 'scan_interval': float(self.scan_var.get()),
@@ -302,7 +324,7 @@ class SettingsDialog:
             
             self.on_save(new_settings, self.monitor_region)
             logger.info("设置已实时保存")
-            
+        
         except ValueError:
             pass
     
@@ -320,7 +342,7 @@ class SettingsDialog:
             self.on_delete_spec(spec_to_delete)
     
     def _set_region(self):
-        self.window.destroy()
+        self.close()
         self.on_set_region()
     
     def _apply_coordinates(self):
@@ -337,7 +359,7 @@ class SettingsDialog:
             
             self.monitor_region = (new_x, new_y, new_w, new_h)
             logger.info(f"设置监控区域: {self.monitor_region}")
-            
+        
         except ValueError:
             pass
     
@@ -364,6 +386,6 @@ class SettingsDialog:
                 raise ValueError("宽度和高度必须大于0")
             
             self.on_preview_region(x, y, w, h)
-            
+        
         except ValueError as e:
             logger.error(f"坐标错误: {e}")
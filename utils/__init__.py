@@ -1,6 +1,8 @@
 from .logger import setup_logger, get_logger
+from .lazy import lazy_import
 
 __all__ = [
     'setup_logger',
     'get_logger',
+    'lazy_import',
 ]
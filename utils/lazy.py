@@ -0,0 +1,19 @@
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    # 第一次访问属性时才真正导入模块, 之后属性直接从实例字典中读取, 热路径上没有额外开销
+    def __getattr__(self, attr: str):
+        __import__(self.__name__)
+        module = sys.modules[self.__name__]
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    # 已经导入的模块直接返回, 否则返回占位模块, 把导入开销推迟到第一次使用
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
@@ -1,33 +1,67 @@
 import logging
+import os
 import sys
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List, TextIO
 
 
 _loggers: dict[str, logging.Logger] = {}
 MAX_LOG_LINES = 100
 
 
-class LimitedFileHandler(logging.FileHandler):
+class SegmentedFileHandler(logging.FileHandler):
+    # 按段轮换: 当前段写满 max_lines 行后改名为 .1 (覆盖更早的一段) 再开始新的一段,
+    # 每条记录只是一次追加写; 两段合起来总能拼出最近的 max_lines 行, 见 read_recent_lines
     def __init__(self, filename, mode='a', encoding=None, delay=False, max_lines=MAX_LOG_LINES):
         super().__init__(filename, mode, encoding, delay)
         self.max_lines = max_lines
+        self.backup_filename = self.baseFilename + ".1"
+        self._line_count = _count_lines(self.baseFilename) if mode == 'a' else 0
     
-    def emit(self, record):
-        super().emit(record)
-        self._trim_file()
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename):
+            os.replace(self.baseFilename, self.backup_filename)
+        self._line_count = 0
     
-    def _trim_file(self):
+    def emit(self, record):
+        # 记录只格式化一次, 同时得到行数
         try:
-            with open(self.baseFilename, 'r', encoding=self.encoding) as f:
-                lines = f.readlines()
+            msg = self.format(record) + self.terminator
+            lines = msg.count('\n')
+            if self._line_count and self._line_count + lines > self.max_lines:
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
             
-            if len(lines) > self.max_lines:
-                with open(self.baseFilename, 'w', encoding=self.encoding) as f:
-                    f.writelines(lines[-self.max_lines:])
+            self.stream.write(msg)
+            self.flush()
+            self._line_count += lines
         except Exception:
-            pass
+            self.handleError(record)
+
+
+def _count_lines(path: str) -> int:
+    try:
+        with open(path, 'rb') as f:
+            return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(65536), b''))
+    except OSError:
+        return 0
+
+
+def read_recent_lines(path: Path, count: int = MAX_LOG_LINES, encoding: str = 'utf-8') -> List[str]:
+    # 按时间顺序拼接上一段和当前段, 返回最后 count 行
+    lines: List[str] = []
+    for segment in (Path(f"{path}.1"), Path(path)):
+        try:
+            with open(segment, 'r', encoding=encoding, errors='replace') as f:
+                lines.extend(f.read().splitlines())
+        except OSError:
+            continue
+    return lines[-count:] if count > 0 else []
 
 
 def setup_logger(
@@ -59,7 +93,7 @@ def setup_logger(
         log_dir.mkdir(parents=True, exist_ok=True)
         
         log_file = log_dir / f"wow_helper_{datetime.now().strftime('%Y%m%d')}.log"
-        file_handler = LimitedFileHandler(
+        file_handler = SegmentedFileHandler(
             log_file,
             encoding='utf-8',
             mode='a'
@@ -72,6 +106,13 @@ def setup_logger(
     return logger
 
 
+def set_console_stream(stream: TextIO, name: str = "wow_helper"):
+    # 无界面模式下标准输出留给统计信息等数据, 控制台日志改写到 stderr
+    for handler in get_logger(name).handlers:
+        if type(handler) is logging.StreamHandler:
+            handler.setStream(stream)
+
+
 def get_logger(name: str = "wow_helper") -> logging.Logger:
     if name in _loggers:
         return _loggers[name]
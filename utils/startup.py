@@ -0,0 +1,66 @@
+import builtins
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple, Optional, TextIO
+
+
+class StartupProfiler:
+    # 替换 builtins.__import__, 按顶级包统计首次导入的耗时 (不含其导入的其他包)
+    def __init__(self):
+        self._original = builtins.__import__
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.module_seconds: Dict[str, float] = {}
+        self.marks: List[Tuple[str, float]] = []
+        self.started_at = time.perf_counter()
+        self.installed = False
+    
+    def install(self) -> 'StartupProfiler':
+        if not self.installed:
+            builtins.__import__ = self._import
+            self.installed = True
+        return self
+    
+    def uninstall(self):
+        if self.installed:
+            builtins.__import__ = self._original
+            self.installed = False
+    
+    def mark(self, label: str):
+        self.marks.append((label, time.perf_counter() - self.started_at))
+    
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # 相对导入和已导入的模块不计时, 只统计真正执行模块代码的那一次
+        if level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        
+        # 每个线程一个栈, 嵌套导入的耗时从外层扣除, 各顶级包只记自身代码的耗时
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            
+            top = name.partition('.')[0]
+            with self._lock:
+                self.module_seconds[top] = self.module_seconds.get(top, 0.0) + elapsed - nested
+    
+    def report(self, limit: int = 15, stream: Optional[TextIO] = None):
+        stream = stream or sys.stderr
+        total = time.perf_counter() - self.started_at
+        imports = sum(self.module_seconds.values())
+        
+        print(f"启动耗时 {total * 1000:.1f} ms, 其中导入 {imports * 1000:.1f} ms", file=stream)
+        ranked = sorted(self.module_seconds.items(), key=lambda item: item[1], reverse=True)
+        for name, seconds in ranked[:limit]:
+            print(f"  {name:<24} {seconds * 1000:8.1f} ms", file=stream)
+        for label, seconds in self.marks:
+            print(f"  @ {label:<22} {seconds * 1000:8.1f} ms", file=stream)